@@ -1,16 +1,23 @@
 class Dot:
     """
     A class to represent a dot with coordinates and a value.
+
+    A dot can stand for a run of identical stationary dots (see DataUtils.dedup_dots), its weight is
+    the number of dots it replaces.
     """
+    # dots pickled by older versions have no weight of their own
+    w = 1
 
-    def __init__(self, x: float, y: float, v: float) -> None:
+    def __init__(self, x: float, y: float, v: float, w: float = 1) -> None:
         """
         Constructs a Dot object with the given x and y coordinates and value.
 
         :param x: x coordinate of the dot.
         :param y: y coordinate of the dot.
         :param v: value of the dot.
+        :param w: weight of the dot, the number of identical dots it stands for.
         """
         self.x = x
         self.y = y
-        self.v = v
\ No newline at end of file
+        self.v = v
+        self.w = w
@@ -1,6 +1,7 @@
 import numpy as np
 from .neural_network.network import Network
-from .variables.constants import V_MIN, X_MAX, X_MIN, Y_MAX, Y_MIN, V_MAX
+from .basic_classes.dot import Dot
+from .variables.constants import V_MIN, X_MAX, X_MIN, Y_MAX, Y_MIN, V_MAX, DTYPE
 
 class DataUtils:
     """
@@ -8,18 +9,21 @@ class DataUtils:
     """
 
     @staticmethod
-    def normalize_data(data: np.ndarray, max_speed: float = -1) -> np.ndarray:
+    def normalize_data(data: np.ndarray, max_speed: float = -1, dtype=DTYPE) -> np.ndarray:
         """
         Normalizes the input data between 0 and 1.
 
         Args:
             data: A numpy array of shape (n_samples, 3) containing the x, y, and v values for each sample.
             max_speed: A float representing the maximum speed to use for normalization of the v values.
-                If set to -1 (default), the maximum v value in the data is used.
+                If set to -1 (default), the maximum v value in the data is used. A maximum not above V_MIN
+                (only stationary dots) normalizes every v to 0.
+            dtype: The floating point type of the returned array, defaults to DTYPE.
 
         Returns:
             A numpy array of the same shape as the input data, where the x, y, and v values are normalized between 0 and 1.
         """
+        data = np.asarray(data, dtype=dtype)
         x = data[:, 0]
         x = (x - X_MIN) / (X_MAX - X_MIN)
 
@@ -28,7 +32,10 @@ class DataUtils:
 
         v = data[:, 2]
         if max_speed == -1:
-            v = (v - V_MIN) / (v.max() - V_MIN)
+            max_speed = v.max() if len(v) > 0 else V_MIN
+        if max_speed <= V_MIN:
+            # the user never moved faster than V_MIN, every v is at the bottom of the range
+            v = np.zeros_like(v)
         else:
             v = (v - V_MIN) / (max_speed - V_MIN)
 
@@ -49,43 +56,70 @@ class DataUtils:
         array_2d = np.array(dot_values)
         return array_2d
 
+    @staticmethod
+    def dots_to_weights(dots: list) -> np.ndarray:
+        """
+        Converts the weights of a list of Dot instances to a numpy array.
+
+        Args:
+            dots: A list of Dot instances.
+
+        Returns:
+            A 1D numpy array of length n_samples containing the weight of each Dot instance.
+        """
+        return np.array([dot.w for dot in dots], dtype=float)
+
+    @staticmethod
+    def dedup_dots(dots: list) -> list:
+        """
+        Collapses every run of identical stationary dots (v == 0 at the same x and y, which an idle mouse keeps
+        producing) into one dot whose weight is the total weight of the run. The moving dots are kept as they are.
+
+        Args:
+            dots: A list of Dot instances, in the order they were collected.
+
+        Returns:
+            A list of Dot instances without consecutive duplicate stationary dots.
+        """
+        deduped = []
+        for dot in dots:
+            last = deduped[-1] if deduped else None
+            if last is not None and dot.v == 0 and last.v == 0 and dot.x == last.x and dot.y == last.y:
+                # a new object, the dots of the caller are never changed
+                deduped[-1] = Dot(last.x, last.y, 0, last.w + dot.w)
+            else:
+                deduped.append(dot)
+        return deduped
+
     @staticmethod
     def get_avg_cost(network: Network, data: list) -> float:
         """
         Calculates the average cost of the autoencoder for the input data.
+        The whole data is scored in one vectorized pass through the network.
 
         Args:
             network: A Network instance representing the autoencoder model.
-            data: A list of input data items.
+            data: A 2D numpy array (or a list) of input data items.
 
         Returns:
             A float representing the average cost of the autoencoder for the input data.
         """
-        cost_sum = 0
-
-        for item in data:
-            cost_sum += network.calc_cost(item, item)
-
-        return cost_sum / len(data)
+        return float(network.cost_batch(np.asarray(data)).mean())
 
     @staticmethod
     def get_accuracy(network: Network, data: list) -> float:
         """
         Calculates the average output value of the final layer of the neural network for the input data.
+        The whole data is predicted in one vectorized pass through the network.
 
         Args:
             network: A Network instance representing the neural network model.
-            data: A list of input data items.
+            data: A 2D numpy array (or a list) of input data items.
 
         Returns:
-            A float representing the average output value of the final layer of the neural network for the input data.
+            A numpy array representing the average output value of the final layer of the neural network for the input data.
         """
-        prediction = 0
-
-        for item in data:
-            prediction += network.predict(item)
-
-        return prediction / len(data)
+        return network.predict_batch(np.asarray(data)).mean(axis=0)
     
     def format_new(raw_data):
         """
@@ -14,4 +14,17 @@ def tanh_deriv(x): return 1-np.tanh(x)**2
 def ReLU(x): return x * (x > 0)
 def ReLU_deriv(x): return 1 * (x > 0)
 
+activations = {'sigmoid':sigmoid,'tanh':tanh,'ReLU':ReLU}
 activations_derivs = {'sigmoid':sigmoid_deriv,'tanh':tanh_deriv,'ReLU':ReLU_deriv}
+
+
+# In-place versions, the result is written into x (used by the frozen inference network)
+def sigmoid_inplace(x):
+    np.negative(x, out=x)
+    np.exp(x, out=x)
+    x += 1
+    return np.reciprocal(x, out=x)
+def tanh_inplace(x): return np.tanh(x, out=x)
+def ReLU_inplace(x): return np.maximum(x, 0, out=x)
+
+activations_inplace = {'sigmoid':sigmoid_inplace,'tanh':tanh_inplace,'ReLU':ReLU_inplace}
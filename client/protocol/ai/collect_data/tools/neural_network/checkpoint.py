@@ -0,0 +1,169 @@
+import glob
+import os
+import queue
+import threading
+import time
+import numpy as np
+from ..variables.constants import CHECKPOINT_EVERY_EPOCHS, CHECKPOINT_EVERY_SECONDS, CHECKPOINT_KEEP_LAST
+
+# directory of the networks saved by Network.save
+NETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nets')
+# default directory of the checkpoint files, apart from the saved networks so that removing old
+# checkpoints never touches them
+CHECKPOINTS_DIR = os.path.join(NETS_DIR, 'checkpoints')
+
+
+def snapshot(network) -> dict:
+    """
+    Copies the weights, biases and activation names of a network into a dictionary of arrays,
+    the format written to a checkpoint file.
+
+    Args:
+    network (Network): The network to copy.
+
+    Returns:
+    dict: The arrays of the checkpoint ('activations', 'weights_<i>' and 'bias_<i>' for every layer).
+    """
+    arrays = {'activations': np.array([layer.activation.__name__ for layer in network.layers])}
+    for i, layer in enumerate(network.layers):
+        arrays[f'weights_{i}'] = layer.weights.copy()
+        arrays[f'bias_{i}'] = layer.bias.copy()
+    return arrays
+
+
+def write_checkpoint(path: str, arrays: dict) -> None:
+    """
+    Writes a snapshot to an uncompressed npz file. The file is written under a temporary name
+    and then renamed, so a reader never sees a partial checkpoint.
+
+    Args:
+    path (str): The path of the checkpoint file.
+    arrays (dict): The arrays returned by snapshot().
+    """
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(temp_path, path)
+
+
+def read_checkpoint(path: str) -> tuple:
+    """
+    Reads a checkpoint file.
+
+    Args:
+    path (str): The path of the checkpoint file.
+
+    Returns:
+    tuple: The activation names of the layers and a list of (weights, bias) pairs, one per layer.
+    """
+    with np.load(path) as arrays:
+        activation_names = [str(name) for name in arrays['activations']]
+        params = [(arrays[f'weights_{i}'], arrays[f'bias_{i}']) for i in range(len(activation_names))]
+    return activation_names, params
+
+
+class CheckpointManager:
+    """
+    Saves training checkpoints from a background thread, so the training loop never waits on the disk.
+
+    A checkpoint is taken every 'every_epochs' epochs or 'every_seconds' seconds (whichever comes first).
+    The training thread only copies the weights, the copy is written by the writer thread. If the writer
+    is still busy when a new checkpoint is taken, the pending one is replaced by the newer one.
+    Only the last 'keep_last' checkpoints of the same name are kept on disk.
+
+    Attributes:
+    directory (str): The directory of the checkpoint files.
+    name (str): The prefix of the checkpoint file names.
+    every_epochs (int): Save every this many epochs, None to not save by epochs.
+    every_seconds (float): Save every this many seconds, None to not save by time.
+    keep_last (int): The number of checkpoint files kept (at least 1), None to keep all of them.
+    """
+
+    def __init__(self, name: str = 'network', directory: str = CHECKPOINTS_DIR, every_epochs: int = CHECKPOINT_EVERY_EPOCHS,
+                 every_seconds: float = CHECKPOINT_EVERY_SECONDS, keep_last: int = CHECKPOINT_KEEP_LAST) -> None:
+        if keep_last is not None and keep_last < 1:
+            raise ValueError(f'keep_last must be at least 1 (or None to keep every checkpoint), got {keep_last}')
+        self.name = name
+        self.directory = directory
+        self.every_epochs = every_epochs
+        self.every_seconds = every_seconds
+        self.keep_last = keep_last
+
+        self.last_epoch = 0
+        self.last_time = time.time()
+        self.pending = queue.Queue(maxsize=1)
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.writer = threading.Thread(target=self.__write_loop, daemon=True)
+        self.writer.start()
+
+    def maybe_save(self, network, epoch: int) -> bool:
+        """
+        Takes a checkpoint if enough epochs or time passed since the last one.
+
+        Args:
+        network (Network): The network being trained.
+        epoch (int): The number of epochs done so far.
+
+        Returns:
+        bool: True if a checkpoint was taken.
+        """
+        due = (self.every_epochs is not None and epoch - self.last_epoch >= self.every_epochs) or \
+              (self.every_seconds is not None and time.time() - self.last_time >= self.every_seconds)
+        if due:
+            self.save(network, epoch)
+        return due
+
+    def save(self, network, epoch: int) -> None:
+        """
+        Takes a checkpoint now, the file is written in the background.
+
+        Args:
+        network (Network): The network being trained.
+        epoch (int): The number of epochs done so far.
+        """
+        self.last_epoch = epoch
+        self.last_time = time.time()
+        path = os.path.join(self.directory, f'{self.name}_{network.time}_{epoch:06d}.npz')
+        item = (path, snapshot(network))
+
+        # replace a checkpoint the writer did not get to yet
+        while True:
+            try:
+                self.pending.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.pending.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def close(self) -> None:
+        """
+        Waits for the pending checkpoint to be written and stops the writer thread.
+        """
+        self.pending.put(None)
+        self.writer.join()
+
+    def __write_loop(self) -> None:
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            path, arrays = item
+            try:
+                write_checkpoint(path, arrays)
+                self.__remove_old()
+            except OSError as e:
+                print(f'Checkpoint {path} was not saved: {e}')
+
+    def __remove_old(self) -> None:
+        if self.keep_last is None:
+            return
+        # checkpoint files are named {name}_{network time}_{epoch}.npz
+        files = sorted(glob.glob(os.path.join(self.directory, f'{glob.escape(self.name)}_*_*.npz')), key=os.path.getmtime)
+        for path in files[:len(files) - self.keep_last]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
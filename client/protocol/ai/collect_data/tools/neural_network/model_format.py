@@ -0,0 +1,116 @@
+"""
+Binary model format used to store and transfer trained networks.
+
+Layout:
+    MAGIC (4 bytes) | version (uint16) | header length (uint32) | header (utf-8 JSON) | padding | data
+
+The JSON header holds the dtype, the shape of every layer and the names of the activation functions.
+The data is the weights (row major) followed by the bias of every layer, one contiguous buffer starting
+at a multiple of DATA_ALIGNMENT, so the arrays can be viewed in place with np.frombuffer / np.memmap.
+"""
+import json
+import struct
+import numpy as np
+
+MAGIC = b'MTNN'
+VERSION = 1
+DATA_ALIGNMENT = 64
+PREFIX = struct.Struct('<4sHI')  # magic, version, header length
+
+
+def is_model(buffer) -> bool:
+    """
+    Checks whether a buffer holds a model in this format (as opposed to a legacy pickled network).
+
+    Args:
+    buffer (bytes): The buffer to check.
+
+    Returns:
+    bool: True if the buffer starts with the format's magic bytes.
+    """
+    return bytes(buffer[:len(MAGIC)]) == MAGIC
+
+
+def encode(activation_names: list, params: list) -> bytes:
+    """
+    Encodes the parameters of a network.
+
+    Args:
+    activation_names (list): The name of the activation function of every layer.
+    params (list): A (weights, bias) pair of arrays for every layer, all of the same dtype.
+
+    Returns:
+    bytes: The encoded model.
+    """
+    dtype = np.dtype(params[0][0].dtype).newbyteorder('<')
+    header = json.dumps({
+        'dtype': dtype.str,
+        'shapes': [list(weights.shape) for weights, bias in params],
+        'activations': list(activation_names),
+    }).encode()
+
+    data_offset = PREFIX.size + len(header)
+    padding = -data_offset % DATA_ALIGNMENT
+
+    chunks = [PREFIX.pack(MAGIC, VERSION, len(header) + padding), header, b' ' * padding]
+    for weights, bias in params:
+        chunks.append(np.ascontiguousarray(weights, dtype=dtype).tobytes())
+        chunks.append(np.ascontiguousarray(bias, dtype=dtype).tobytes())
+    return b''.join(chunks)
+
+
+def decode(buffer) -> tuple:
+    """
+    Decodes a model without copying its data, the returned arrays are views into 'buffer'
+    (read-only if the buffer is).
+
+    Args:
+    buffer (bytes, memoryview or np.ndarray): The encoded model, for example an np.memmap of a model file.
+
+    Returns:
+    tuple: The activation names of the layers and a list of (weights, bias) pairs, one per layer.
+    """
+    magic, version, header_len = PREFIX.unpack(bytes(buffer[:PREFIX.size]))
+    if magic != MAGIC:
+        raise ValueError('Not a model buffer')
+    if version != VERSION:
+        raise ValueError(f'Unsupported model version {version}')
+
+    header = json.loads(bytes(buffer[PREFIX.size:PREFIX.size + header_len]).decode())
+    dtype = np.dtype(header['dtype'])
+
+    params = []
+    offset = PREFIX.size + header_len
+    for input_len, output_len in header['shapes']:
+        weights = np.frombuffer(buffer, dtype, input_len * output_len, offset).reshape(input_len, output_len)
+        offset += weights.nbytes
+        bias = np.frombuffer(buffer, dtype, output_len, offset)
+        offset += bias.nbytes
+        params.append((weights, bias))
+
+    return header['activations'], params
+
+
+def read(path: str) -> tuple:
+    """
+    Memory maps a model file and decodes it, the weights are read from the disk only when used.
+
+    Args:
+    path (str): The path of the model file.
+
+    Returns:
+    tuple: The activation names of the layers and a list of (weights, bias) pairs, one per layer.
+    """
+    return decode(np.memmap(path, dtype=np.uint8, mode='r'))
+
+
+def write(path: str, buffer: bytes) -> None:
+    """
+    Writes an encoded model to a file.
+
+    Args:
+    path (str): The path of the model file.
+    buffer (bytes): The encoded model.
+    """
+    with open(path, 'wb') as f:
+        f.write(buffer)
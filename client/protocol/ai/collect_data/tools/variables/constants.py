@@ -22,3 +22,13 @@ TOKEN_VALIDATION_TIME = 1*60*60 # 1 hour
 
 # Minimum number of dots required to test a user
 MIN_DOTS_TO_TEST_USER = 100
+
+# Floating point type used by the neural network and the normalized data
+DTYPE = 'float32'
+
+# Save a training checkpoint every this many epochs
+CHECKPOINT_EVERY_EPOCHS = 10
+# Save a training checkpoint at least every this many seconds
+CHECKPOINT_EVERY_SECONDS = 10*60 # 10 minutes
+# Number of checkpoint files kept per trained network
+CHECKPOINT_KEEP_LAST = 3
@@ -11,7 +11,7 @@ class TestData:
         Initializes the TestData object with a neural network model and a cost limit.
 
         Args:
-        - network: an instance of the Network class, which is the neural network model to be tested.
+        - network: an instance of the Network class (or a FrozenNetwork made by Network.freeze()), which is the neural network model to be tested.
         - limit: a floating-point number representing the maximum allowed cost of the model on a given set of data.
         """
         self.network = network
@@ -20,9 +20,10 @@ class TestData:
     def test(self, data: list) -> bool:
         """
         Tests the performance of the neural network model on the given set of data.
+        The whole window is scored with a single vectorized pass through the network.
 
         Args:
-        - data: a list of input-output pairs representing the data to test the model on.
+        - data: a 2D numpy array of shape (N, 3) holding the normalized dots to test the model on.
 
         Returns:
         - A boolean value indicating whether the average cost of the model on the data is less than or equal to the specified limit.
@@ -40,13 +40,14 @@ class ProtectionSoftware():
         
         Args:
         - username: the username of the user.
-        - neural_network: an instance of the neural network that will be used to test mouse movements.
+        - neural_network: an instance of the neural network that will be used to test mouse movements,
+          it is frozen into an inference-only copy for the scoring loop.
         - limit: the threshold limit for determining an irregular mouse movement.
         - email: the email address where notifications will be sent.
         
         Returns: None
         """
-        self.data_tester = TestData(neural_network, limit)
+        self.data_tester = TestData(neural_network.freeze(), limit)
         self.email = email
         self.ready = True
         self.data_formator = DataUtils.format_new
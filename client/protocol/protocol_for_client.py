@@ -4,6 +4,8 @@ from .cipher.aes import AESCipher
 from Crypto.PublicKey import RSA
 from Crypto.Cipher import PKCS1_OAEP
 from .ai.collect_data.tools.neural_network.network import Network
+from .ai.collect_data.tools.neural_network import model_format
+from .ai.collect_data.tools.data_utils import DataUtils
 import base64
 import pickle
 
@@ -174,10 +176,25 @@ class NetC:
             print("More data is required.")
             return 3*(False,)
         elif answer.split('~')[0] == 'NETREP':
-            return pickle.loads(base64.b64decode(answer.split('~')[1])), float(answer.split('~')[2]), answer.split('~')[3]
+            return self.__load_network(base64.b64decode(answer.split('~')[1])), float(answer.split('~')[2]), answer.split('~')[3]
         else:
             raise Exception('Wrong message')
 
+    @staticmethod
+    def __load_network(payload: bytes) -> Network:
+        """
+        Loads a network sent by the server.
+
+        Args:
+        payload (bytes): The network in the binary model format, or a pickled network from older servers.
+
+        Returns:
+        Network: The network, its weights are views into the payload (no copy).
+        """
+        if model_format.is_model(payload):
+            return Network.from_bytes(payload)
+        return pickle.loads(payload)
+
     def send_mouse_data(self, data: list) -> bool:
         """
         Sends mouse data to the server for training.
@@ -194,6 +211,9 @@ class NetC:
         if answer != 'IMREAD':
             raise Exception('Wrong message')
 
+        # an idle mouse keeps sending the same dot, every run of them is sent once with its weight
+        data = DataUtils.dedup_dots(data)
+
         CHUNKS = 100
         for i in range((len(data)//CHUNKS)+1):
             data_batch = base64.b64encode(pickle.dumps(
@@ -0,0 +1,447 @@
+import threading
+import numpy as np
+from .basic_classes.user import User
+from .storage_engine import StorageEngine, stratified_indices
+from .reservoir import reservoir_slots
+from .variables.constants import STREAM_CHUNK_SIZE, RESERVOIR_SIZE
+
+
+class MemoryEngine(StorageEngine):
+    """
+    A storage engine (see StorageEngine) that keeps everything in the memory of the process, the dots in
+    NumPy arrays. Nothing is written to disk and nothing survives the process, so it is meant for tests and
+    benchmarks: running NetS and MainServer against it measures the protocol without the cost of the storage.
+
+    Like the chunks of SQLiteEngine, every inserted batch of a user is kept as one block: the sequence
+    numbers, the (N, 3) x, y, and v values and the weights of its dots. Every method holds one lock, so the
+    engine is safe to share between threads.
+
+    Attributes:
+    reservoir_size (int): The number of slots of the cross-user sample.
+    """
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE):
+        self.reservoir_size = reservoir_size
+        self.lock = threading.RLock()
+
+        self.users = {}  # id -> (username, password, email)
+        self.last_user_id = 0
+        self.networks = {}  # id -> the network in the binary model format
+        self.watermarks = {}  # id -> training watermark
+        self.stats = {}  # id -> running statistics, like the user_stats table
+        self.blocks = {}  # id -> list of (seqs, dots, weights)
+        self.last_seq = 0
+
+        self.reservoir_ids = np.empty(reservoir_size, dtype=np.int64)
+        self.reservoir_dots = np.empty((reservoir_size, 3))
+        self.reservoir_seen = 0
+
+    # users
+
+    def insert_user(self, u: User):
+        """
+        Inserts a new user, the engine assigns the new id.
+
+        Args:
+            - u: a User object representing the user to insert.
+
+        Returns:
+            - True if the insertion was successful, False otherwise (the username is taken).
+        """
+        with self.lock:
+            if any(user[0] == u.username for user in self.users.values()):
+                return False
+            self.last_user_id += 1
+            self.users[self.last_user_id] = (u.username, u.password, u.email)
+        return True
+
+    def get_id(self, username):
+        """
+        Retrieves the id of a user given their username.
+
+        Args:
+            - username: the username of the user to retrieve.
+
+        Returns:
+            - id: the id of the user.
+        """
+        with self.lock:
+            return [id for id, user in sorted(self.users.items()) if user[0] == username][0]
+
+    def get_all_id(self):
+        """
+        Retrieve all the ids of the users.
+
+        Returns:
+        - list: A list of all the ids of the users.
+        """
+        with self.lock:
+            return list(self.users)
+
+    def get_users_list(self):
+        """
+        Retrieve a list of all usernames.
+
+        Returns:
+        - list: A list of all usernames.
+        """
+        with self.lock:
+            return [user[0] for user in self.users.values()]
+
+    def get_user_password(self, username):
+        """"
+        if user exist return his password
+        if not return false
+        """
+        with self.lock:
+            passwords = [user[1] for id, user in sorted(self.users.items()) if user[0] == username]
+        return passwords[0] if passwords else False
+
+    def get_email(self, id: int) -> str:
+        """
+        Retrieves the email associated with a user ID.
+
+        Args:
+        id (int): The ID of the user.
+
+        Returns:
+        str: The email address associated with the user ID, or False if the user ID is not found.
+        """
+        with self.lock:
+            user = self.users.get(id)
+        return user[2] if user is not None else False
+
+    def delete_user(self, username) -> bool:
+        """
+        Delete a user and associated data.
+
+        Args:
+        - username (str): The username of the user to delete.
+
+        Returns:
+        - bool: True if the user was deleted successfully, False otherwise.
+        """
+        with self.lock:
+            if not self.get_user_password(username):
+                return False
+            id = self.get_id(username)
+            for table in (self.users, self.networks, self.watermarks, self.stats, self.blocks):
+                table.pop(id, None)
+
+            # the user's slots of the cross-user sample are emptied, the next ingested dots fill them
+            filled = min(self.reservoir_seen, self.reservoir_size)
+            self.reservoir_ids[:filled][self.reservoir_ids[:filled] == id] = -1
+        return True
+
+    # networks and training
+
+    def dump_neural_network(self, id: int, network):
+        """
+        Stores a neural network.
+
+        Args:
+        id (int): The ID of the network.
+        network (Network or bytes): The neural network object, or a network already encoded in the binary model format.
+
+        Returns:
+        bool: True if the operation is successful.
+        """
+        serialized_network = network if isinstance(network, bytes) else network.to_bytes()
+        with self.lock:
+            self.networks[id] = serialized_network
+        return True
+
+    def get_neural_network(self, id: int):
+        """
+        Retrieves the stored neural network of a network ID.
+
+        Args:
+        id (int): The ID of the network.
+
+        Returns:
+        bytes: The network in the binary model format, or False if the network ID is not found.
+        """
+        with self.lock:
+            return self.networks.get(id, False)
+
+    def has_neural_network(self, id: int) -> bool:
+        """
+        Checks whether a neural network is stored for a network ID.
+
+        Args:
+        id (int): The ID of the network.
+
+        Returns:
+        bool: True if a network is stored for the ID.
+        """
+        with self.lock:
+            return id in self.networks
+
+    def get_training_watermark(self, id: int) -> int:
+        """
+        Retrieves the last dot the user's network was trained on.
+
+        Args:
+        id (int): The ID of the user.
+
+        Returns:
+        int: The watermark, or 0 if the user was never trained.
+        """
+        with self.lock:
+            return self.watermarks.get(id, 0)
+
+    def set_training_watermark(self, id: int, watermark: int) -> bool:
+        """
+        Stores the last dot the user's network was trained on.
+
+        Args:
+        id (int): The ID of the user.
+        watermark (int): The sequence number of the last dot used for training.
+
+        Returns:
+        bool: True if the operation is successful.
+        """
+        with self.lock:
+            self.watermarks[id] = watermark
+        return True
+
+    # dots
+
+    def insert_dots_groups(self, groups: list) -> bool:
+        """
+        Inserts batches of dots of several users, all at once.
+
+        Args:
+        groups (list): (id, dots) pairs or (id, dots, weights) triples, dots being a 2D array of shape (N, 3)
+                       holding the x, y, and v values of every new dot of the user and weights the weight of
+                       every dot (None for a weight of 1).
+
+        Returns:
+        bool: True if the insertion was successful, False otherwise.
+        """
+        groups = StorageEngine.normalize_groups(groups)
+        with self.lock:
+            for id, dots, weights in groups:
+                # the values go through float32 like the chunks of SQLiteEngine, so both engines return the
+                # same values and statistics
+                dots = np.ascontiguousarray(dots, dtype='<f4').astype(float)
+                weights = np.ascontiguousarray(weights, dtype='<f4').astype(float)
+                seqs = np.arange(self.last_seq + 1, self.last_seq + len(dots) + 1, dtype=np.int64)
+                self.last_seq += len(dots)
+                self.blocks.setdefault(id, []).append((seqs, dots, weights))
+                self.__update_stats(id, dots, self.last_seq)
+                self.__sample_dots(id, dots)
+        return True
+
+    def get_user_stats(self, id: int):
+        """
+        Retrieves the running statistics of a user's dots.
+
+        Args:
+        id (int): The ID of the user.
+
+        Returns:
+        dict: The count, min/max/sum of x, y and v and the sequence number of the last inserted dot,
+              or False if the user has no dots.
+        """
+        with self.lock:
+            stats = self.stats.get(id)
+            return dict(stats) if stats is not None else False
+
+    def count_dots_since(self, id: int, watermark: int) -> int:
+        """
+        Counts the dots inserted for a user after a watermark.
+
+        Args:
+        id (int): The ID of the user.
+        watermark (int): The sequence number to count from (exclusive).
+
+        Returns:
+        int: The number of dots.
+        """
+        with self.lock:
+            return sum(int(np.count_nonzero(seqs > watermark)) for seqs, dots, weights in self.blocks.get(id, []))
+
+    def get_user_data(self, id):
+        """
+        Retrieve the x, y, and v values of a user.
+
+        Args:
+        - id (int): The id of the user to retrieve data for.
+
+        Returns:
+        - numpy.ndarray: A NumPy array containing the x, y, and v values for the given id.
+        """
+        return self.get_user_weighted_data_since(id, 0)[0]
+
+    def get_user_weighted_data_since(self, id, watermark):
+        """
+        Retrieve the x, y, and v values and the weights of the dots a user inserted after a watermark.
+
+        Args:
+        - id (int): The id of the user to retrieve data for.
+        - watermark (int): The sequence number to start after.
+
+        Returns:
+        - tuple: A NumPy array containing the x, y, and v values, a NumPy array containing the weight of every dot,
+                 and the sequence number of the last returned dot (the watermark itself if there are no new dots).
+        """
+        with self.lock:
+            seqs, dots, weights = self.__user_dots(id)
+        new = seqs > watermark
+        last = int(seqs[new].max()) if new.any() else watermark
+        return dots[new], weights[new], last
+
+    def iter_user_data(self, id, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Streams the x, y, and v values of a user in fixed-size chunks, in insertion order.
+
+        Args:
+        - id (int): The id of the user to retrieve data for.
+        - chunk_size (int): The number of dots in every chunk (the last one may be shorter).
+
+        Yields:
+        - numpy.ndarray: A (chunk_size, 3) array of x, y, and v values.
+        """
+        return MemoryEngine.__iter_chunks(self.get_user_data(id), chunk_size)
+
+    def iter_others_data(self, id, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Streams the x, y, and v values of all the users except one in fixed-size chunks, in insertion order.
+
+        Args:
+        - id (int): The id of the user to exclude.
+        - chunk_size (int): The number of dots in every chunk (the last one may be shorter).
+
+        Yields:
+        - numpy.ndarray: A (chunk_size, 3) array of x, y, and v values.
+        """
+        with self.lock:
+            blocks = [block for other, blocks in self.blocks.items() if other != id for block in blocks]
+        if blocks == []:
+            return MemoryEngine.__iter_chunks(np.empty((0, 3)), chunk_size)
+        order = np.argsort(np.concatenate([block[0] for block in blocks]), kind='stable')
+        return MemoryEngine.__iter_chunks(np.concatenate([block[1] for block in blocks])[order], chunk_size)
+
+    def get_others_data(self, id):
+        """
+        Retrieves the x, y, and v data of all the dots of the users other than the given id.
+
+        Args:
+        id (int): The ID value to exclude.
+
+        Returns:
+        numpy.ndarray: A numpy array containing the x, y, and v data of the dots.
+        """
+        with self.lock:
+            chunks = [dots for other, blocks in self.blocks.items() if other != id for seqs, dots, weights in blocks]
+        return np.concatenate(chunks) if chunks else np.empty((0, 3))
+
+    def get_others_sample(self, id):
+        """
+        Retrieves the x, y, and v data of the dots of the other users that are in the cross-user sample
+        (a fixed-size uniform sample of all the dots, kept up to date at ingest, see reservoir.py).
+        Approximately uniform, like SQLiteEngine.get_others_sample.
+
+        Args:
+        id (int): The ID value to exclude from the sample.
+
+        Returns:
+        numpy.ndarray: A numpy array containing the x, y, and v data of the sampled dots.
+        """
+        with self.lock:
+            filled = min(self.reservoir_seen, self.reservoir_size)
+            ids = self.reservoir_ids[:filled]
+            return self.reservoir_dots[:filled][(ids != id) & (ids != -1)]
+
+    def compact_user(self, id: int, until: int, keep: int) -> int:
+        """
+        Downsamples the dots of a user up to a watermark to 'keep' dots spread evenly over the period
+        (see SQLiteEngine.compact_user). The dots after the watermark are not touched.
+
+        Args:
+        id (int): The ID of the user.
+        until (int): The watermark, the sequence number of the last dot that may be removed.
+        keep (int): The number of dots up to the watermark to keep.
+
+        Returns:
+        int: The number of dots removed.
+        """
+        with self.lock:
+            seqs, dots, weights = self.__user_dots(id)
+            old = np.flatnonzero(seqs <= until)
+            if len(old) <= keep:
+                return 0
+            kept_old = old[stratified_indices(len(old), keep)]
+            kept = np.concatenate((kept_old, np.flatnonzero(seqs > until)))
+
+            self.blocks[id] = [(seqs[kept], dots[kept], weights[kept])]
+            # the statistics are rebuilt from what is left, the last sequence number does not change
+            last_seq = self.stats[id]['last_rowid']
+            del self.stats[id]
+            if len(kept) > 0:
+                self.__update_stats(id, dots[kept], last_seq)
+        return len(old) - len(kept_old)
+
+    def incremental_vacuum(self) -> int:
+        """
+        Nothing to release, the memory of removed dots is freed with their arrays.
+
+        Returns:
+        int: The number of free pages left, always 0.
+        """
+        return 0
+
+    # Private method to gather the blocks of a user, sorted by sequence number. Called with the lock held.
+    def __user_dots(self, id):
+        blocks = self.blocks.get(id, [])
+        if blocks == []:
+            return np.empty(0, dtype=np.int64), np.empty((0, 3)), np.empty(0)
+        seqs = np.concatenate([block[0] for block in blocks])
+        order = np.argsort(seqs, kind='stable')
+        return seqs[order], np.concatenate([block[1] for block in blocks])[order], \
+            np.concatenate([block[2] for block in blocks])[order]
+
+    # Private method to add inserted dots to the running statistics of a user. Called with the lock held.
+    def __update_stats(self, id, dots, last_seq):
+        stats = self.stats.setdefault(id, {
+            'id': id, 'count': 0,
+            'min_x': np.inf, 'max_x': -np.inf, 'sum_x': 0.0,
+            'min_y': np.inf, 'max_y': -np.inf, 'sum_y': 0.0,
+            'min_v': np.inf, 'max_v': -np.inf, 'sum_v': 0.0,
+            'last_rowid': 0,
+        })
+        stats['count'] += len(dots)
+        for name, column in zip('xyv', dots.T):
+            stats[f'min_{name}'] = min(stats[f'min_{name}'], float(column.min()))
+            stats[f'max_{name}'] = max(stats[f'max_{name}'], float(column.max()))
+            stats[f'sum_{name}'] += float(column.sum())
+        stats['last_rowid'] = max(stats['last_rowid'], last_seq)
+
+    # Private method to pass inserted dots through the cross-user reservoir sample. Called with the lock held.
+    def __sample_dots(self, id, dots):
+        filled = min(self.reservoir_seen, self.reservoir_size)
+        free = np.flatnonzero(self.reservoir_ids[:filled] == -1)[:len(dots)]
+        self.reservoir_ids[free] = id
+        self.reservoir_dots[free] = dots[:len(free)]
+
+        # the dots that fill emptied slots are not counted as seen, like in SQLiteEngine.__sample_dots
+        rest = dots[len(free):]
+        slots, indices = reservoir_slots(self.reservoir_seen, len(rest), self.reservoir_size)
+        self.reservoir_ids[slots] = id
+        self.reservoir_dots[slots] = rest[indices]
+        self.reservoir_seen += len(rest)
+
+    @staticmethod
+    def __iter_chunks(data: np.ndarray, chunk_size: int):
+        """
+        Splits an array into chunks of chunk_size rows.
+
+        Args:
+        - data (np.ndarray): The array.
+        - chunk_size (int): The number of rows in every chunk (the last one may be shorter).
+
+        Yields:
+        - numpy.ndarray: The chunks.
+        """
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
@@ -0,0 +1,213 @@
+import sqlite3
+import numpy as np
+from .reservoir import reservoir_slots
+from .variables.constants import RESERVOIR_SIZE
+
+# The schema of the database, as a list of migrations applied in order.
+# The number of migrations applied to a database is kept in its 'user_version' pragma, so every
+# migration runs exactly once per database. Never edit a migration that was released, add a new one.
+
+
+def create_base_tables(cursor: sqlite3.Cursor) -> None:
+    """
+    Creates the users, motion and network tables. A users table created by hand without a primary key
+    is rebuilt with an autoincrement id, keeping the existing ids.
+    """
+    columns = cursor.execute("PRAGMA table_info(users);").fetchall()
+    if columns and not any(name == 'id' and pk for cid, name, type, notnull, default, pk in columns):
+        cursor.execute("ALTER TABLE users RENAME TO users_old;")
+        columns = []
+
+    if not columns:
+        cursor.execute("""
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            password TEXT,
+            email TEXT
+        );
+        """)
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_old';").fetchone():
+        cursor.execute("INSERT INTO users (id, username, password, email) "
+                       "SELECT id, username, password, email FROM users_old ORDER BY id;")
+        cursor.execute("DROP TABLE users_old;")
+
+    cursor.execute("CREATE TABLE IF NOT EXISTS motion (id INTEGER NOT NULL, x REAL, y REAL, v REAL);")
+    cursor.execute("CREATE TABLE IF NOT EXISTS network (id INTEGER PRIMARY KEY, network BLOB);")
+
+
+def create_training_tables(cursor: sqlite3.Cursor) -> None:
+    """
+    Creates training_state, the last motion rowid every user's network was trained on, and user_stats,
+    the running statistics of every user's dots (filled from the existing dots when it is created).
+    """
+    cursor.execute("CREATE TABLE IF NOT EXISTS training_state (id INTEGER PRIMARY KEY, watermark INTEGER NOT NULL);")
+
+    stats_exist = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_stats';").fetchone()
+    if not stats_exist:
+        cursor.execute("""
+        CREATE TABLE user_stats (
+            id INTEGER PRIMARY KEY, count INTEGER NOT NULL,
+            min_x REAL, max_x REAL, sum_x REAL,
+            min_y REAL, max_y REAL, sum_y REAL,
+            min_v REAL, max_v REAL, sum_v REAL,
+            last_rowid INTEGER NOT NULL
+        );
+        """)
+        cursor.execute("""
+        INSERT INTO user_stats
+        SELECT id, COUNT(*), MIN(x), MAX(x), SUM(x), MIN(y), MAX(y), SUM(y), MIN(v), MAX(v), SUM(v), MAX(rowid)
+        FROM motion GROUP BY id;
+        """)
+
+
+def create_indexes(cursor: sqlite3.Cursor) -> None:
+    """
+    Indexes the columns the queries filter by: the motion rows of a user (the index holds the rowid, so
+    counting and the rowid watermarks are answered from it), and the login lookups by username (the index
+    holds the password and the id, so they never read the users table).
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS motion_by_id ON motion (id);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS users_by_username ON users (username, password);")
+
+
+def create_motion_chunks(cursor: sqlite3.Cursor) -> None:
+    """
+    Creates motion_chunks, the chunked layout of the dots: one row per ingested batch holding the batch's
+    dots as a packed float32 (count, 3) blob. 'seq' is the sequence number of the batch's last dot, it
+    continues the rowids of the motion table so the watermarks stay comparable across both layouts.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS motion_chunks (
+        seq INTEGER PRIMARY KEY,
+        id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        dots BLOB NOT NULL
+    );
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS motion_chunks_by_id ON motion_chunks (id);")
+
+
+def create_reservoir(cursor: sqlite3.Cursor) -> None:
+    """
+    Creates reservoir, a fixed-size uniform sample of the dots of all the users (see reservoir.py) that is
+    kept up to date at ingest, and reservoir_state, the number of dots the sample was drawn from and its size.
+    The existing dots (of both layouts) are sampled into it once, here.
+    """
+    cursor.execute("CREATE TABLE reservoir (slot INTEGER PRIMARY KEY, id INTEGER NOT NULL, x REAL, y REAL, v REAL);")
+    cursor.execute("CREATE TABLE reservoir_state (key INTEGER PRIMARY KEY CHECK (key = 0), "
+                   "seen INTEGER NOT NULL, size INTEGER NOT NULL);")
+
+    reservoir = np.empty((RESERVOIR_SIZE, 4))
+    filled = np.zeros(RESERVOIR_SIZE, dtype=bool)
+    seen = 0
+
+    def sample(dots):
+        nonlocal seen
+        slots, indices = reservoir_slots(seen, len(dots), RESERVOIR_SIZE)
+        reservoir[slots] = dots[indices]
+        filled[slots] = True
+        seen += len(dots)
+
+    rows = cursor.execute("SELECT id, x, y, v FROM motion;")
+    while True:
+        batch = rows.fetchmany(10000)
+        if batch == []:
+            break
+        sample(np.array(batch, dtype=float))
+    chunks = cursor.execute("SELECT id, dots FROM motion_chunks ORDER BY seq;")
+    while True:
+        batch = chunks.fetchmany(100)
+        if batch == []:
+            break
+        for id, chunk in batch:
+            dots = np.frombuffer(chunk, dtype='<f4').reshape(-1, 3)
+            sample(np.column_stack((np.full(len(dots), id), dots)))
+
+    slots = np.flatnonzero(filled)
+    cursor.executemany("INSERT INTO reservoir (slot, id, x, y, v) VALUES (?, ?, ?, ?, ?);",
+                       ((slot, int(id), x, y, v) for slot, (id, x, y, v) in zip(slots.tolist(), reservoir[slots].tolist())))
+    cursor.execute("INSERT INTO reservoir_state (key, seen, size) VALUES (0, ?, ?);", (seen, RESERVOIR_SIZE))
+
+
+def add_dot_weights(cursor: sqlite3.Cursor) -> None:
+    """
+    Adds the weight of every dot, the number of identical stationary dots it stands for (see DataUtils.dedup_dots):
+    a 'w' column to motion and a 'weights' blob of float32 values to motion_chunks (NULL when every dot of the
+    chunk weighs 1). The existing dots weigh 1.
+    """
+    cursor.execute("ALTER TABLE motion ADD COLUMN w REAL NOT NULL DEFAULT 1;")
+    cursor.execute("ALTER TABLE motion_chunks ADD COLUMN weights BLOB;")
+
+
+
+def unique_usernames(cursor: sqlite3.Cursor) -> None:
+    """
+    Makes the usernames unique, so a username always names one user. Users that share a username with an
+    older user (a lower id) are renamed to '{username}_{id}' first, their data is kept.
+    """
+    cursor.execute("""
+    UPDATE users SET username = username || '_' || id
+    WHERE EXISTS (SELECT 1 FROM users AS older WHERE older.username = users.username AND older.id < users.id);
+    """)
+    cursor.execute("DROP INDEX IF EXISTS users_by_username;")
+    cursor.execute("CREATE UNIQUE INDEX users_by_username ON users (username);")
+
+
+
+def create_reservoir_free(cursor: sqlite3.Cursor) -> None:
+    """
+    Creates reservoir_free, the slots of the reservoir emptied by deleted users, so that the next ingested
+    dots fill them again. The slots already emptied are found here.
+    """
+    cursor.execute("CREATE TABLE reservoir_free (slot INTEGER PRIMARY KEY);")
+    seen, size = cursor.execute("SELECT seen, size FROM reservoir_state WHERE key = 0;").fetchone()
+    taken = {slot for slot, in cursor.execute("SELECT slot FROM reservoir;")}
+    cursor.executemany("INSERT INTO reservoir_free (slot) VALUES (?);",
+                       ((slot,) for slot in range(min(seen, size)) if slot not in taken))
+
+
+MIGRATIONS = [
+    create_base_tables,
+    create_training_tables,
+    create_indexes,
+    create_motion_chunks,
+    create_reservoir,
+    add_dot_weights,
+    unique_usernames,
+    create_reservoir_free,
+]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Applies the migrations the database is missing, in one transaction.
+
+    Args:
+        conn (sqlite3.Connection): A connection to the database.
+
+    Returns:
+        int: The schema version of the database after the migration.
+
+    Raises:
+        RuntimeError: If the database was migrated by a newer version of the server, whose schema
+                      this version does not know.
+    """
+    cursor = conn.cursor()
+    # the write lock is taken first, so two processes never apply the same migration
+    cursor.execute("BEGIN IMMEDIATE;")
+    try:
+        version = cursor.execute("PRAGMA user_version;").fetchone()[0]
+        if version > len(MIGRATIONS):
+            raise RuntimeError(f'The database schema version {version} is newer than this server knows '
+                               f'({len(MIGRATIONS)}), update the server')
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number};")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(MIGRATIONS)
@@ -0,0 +1,153 @@
+import threading
+import numpy as np
+from .activations import activations_inplace
+from ..variables.constants import MIN_DOTS_TO_TEST_USER
+
+
+class FrozenNetwork:
+    """
+    An immutable, inference-only copy of a Network, made by Network.freeze().
+
+    The weights are read-only, every layer applies its bias and activation in place on a preallocated
+    workspace, and nothing is written to the object while predicting, so one FrozenNetwork can be used
+    by several threads at once (every thread gets its own workspace).
+
+    Methods:
+    predict(self, input_array) -> np.ndarray:
+        Predicts the output for a single input or a batch of inputs.
+
+    predict_batch(self, input_array) -> np.ndarray:
+        Predicts the outputs for a 2D array of inputs.
+
+    cost_batch(self, input_array, target_array=None) -> np.ndarray:
+        Calculates the cost of every row of a 2D array of inputs.
+    """
+
+    def __init__(self, layers: list, batch_size: int = MIN_DOTS_TO_TEST_USER) -> None:
+        """
+        Copies the weights of the layers and prepares the workspace of the calling thread.
+
+        Args:
+        layers (list): The layers of the network to freeze.
+        batch_size (int): The number of rows the workspaces are allocated for, larger batches grow them.
+        """
+        params = []
+        for layer in layers:
+            weights = np.array(layer.weights, order='C')
+            bias = np.array(layer.bias, dtype=weights.dtype)
+            weights.setflags(write=False)
+            bias.setflags(write=False)
+            params.append((weights, bias, activations_inplace[layer.activation.__name__]))
+
+        object.__setattr__(self, '_FrozenNetwork__params', tuple(params))
+        object.__setattr__(self, '_FrozenNetwork__batch_size', batch_size)
+        object.__setattr__(self, '_FrozenNetwork__local', threading.local())
+        self.__workspace(batch_size)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('FrozenNetwork is immutable')
+
+    @property
+    def dtype(self):
+        """
+        The floating point type the network computes in.
+
+        Returns:
+        np.dtype: The dtype of the network's weights.
+        """
+        return self.__params[0][0].dtype
+
+    def __workspace(self, rows: int) -> list:
+        """
+        Returns the workspace buffers of the calling thread, large enough for 'rows' rows:
+        the input buffer, the output buffer of every layer and the cost buffer.
+
+        Args:
+        rows (int): The number of rows needed.
+
+        Returns:
+        list: The buffers.
+        """
+        buffers = getattr(self.__local, 'buffers', None)
+        if buffers is None or len(buffers[0]) < rows:
+            rows = max(rows, self.__batch_size)
+            dtype = self.dtype
+            buffers = [np.empty((rows, self.__params[0][0].shape[0]), dtype)]
+            buffers += [np.empty((rows, weights.shape[1]), dtype) for weights, bias, activation in self.__params]
+            buffers.append(np.empty(rows, dtype))
+            self.__local.buffers = buffers
+        return buffers
+
+    def __forward(self, input_array) -> tuple:
+        """
+        Propagates a batch through the layers inside the workspace.
+
+        Args:
+        input_array (np.ndarray): A 2D numpy array holding one input per row.
+
+        Returns:
+        tuple: The view of the output in the workspace and the workspace itself.
+        """
+        rows = len(input_array)
+        buffers = self.__workspace(rows)
+
+        output = buffers[0][:rows]
+        np.copyto(output, input_array, casting='unsafe')
+        for i, (weights, bias, activation) in enumerate(self.__params):
+            next_output = buffers[i + 1][:rows]
+            np.dot(output, weights, out=next_output)
+            # bias and activation applied in place, no temporary arrays
+            next_output += bias
+            activation(next_output)
+            output = next_output
+
+        return output, buffers
+
+    def predict_batch(self, input_array) -> np.ndarray:
+        """
+        Predicts the outputs for many inputs at once.
+
+        Args:
+        input_array (np.ndarray): A 2D numpy array of shape (N, input_len) holding one input per row.
+
+        Returns:
+        np.ndarray: A 2D numpy array of shape (N, output_len) holding the output for every row.
+        """
+        output, buffers = self.__forward(np.atleast_2d(input_array))
+        return output.copy()
+
+    def predict(self, input_array) -> np.ndarray:
+        """
+        Predicts the output for a given input.
+
+        Args:
+        input_array (np.ndarray): A 1D numpy array representing the input, or a 2D array holding a batch of inputs.
+
+        Returns:
+        np.ndarray: The output of the network for the given input, with the same number of dimensions.
+        """
+        output = self.predict_batch(input_array)
+        return output[0] if np.ndim(input_array) == 1 else output
+
+    def cost_batch(self, input_array, target_array=None) -> np.ndarray:
+        """
+        Calculates the cost of the network for every row of a batch of inputs.
+
+        Args:
+        input_array (np.ndarray): A 2D numpy array of shape (N, input_len) holding one input per row.
+        target_array (np.ndarray): A 2D numpy array of shape (N, output_len) holding the desired outputs.
+            Defaults to the input itself (reconstruction error of an autoencoder).
+
+        Returns:
+        np.ndarray: A 1D numpy array of length N with the cost of every row.
+        """
+        input_array = np.atleast_2d(input_array)
+        if target_array is None:
+            target_array = input_array
+        output, buffers = self.__forward(input_array)
+
+        output -= target_array
+        np.square(output, out=output)
+        cost = buffers[-1][:len(output)]
+        np.sum(output, axis=1, out=cost)
+        return cost.copy()
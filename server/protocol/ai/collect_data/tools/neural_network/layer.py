@@ -1,8 +1,9 @@
 import numpy as np
+from ..variables.constants import DTYPE
 
 
 class Layer:
-    def __init__(self, input_len: int, output_len: int, activation, activation_deriv):
+    def __init__(self, input_len: int, output_len: int, activation, activation_deriv, dtype=DTYPE):
         """
         Initializes a layer of a neural network with random weights and biases.
 
@@ -11,88 +12,123 @@ class Layer:
             output_len (int): number of output neurons for the layer
             activation (function): activation function to be used for the layer
             activation_deriv (function): derivative of the activation function
+            dtype (str or np.dtype): floating point type of the weights and biases, defaults to DTYPE
         """
         # between -1 and 1
-        self.weights = (np.random.rand(input_len, output_len) - 0.5) * 2
-        self.bias = (np.random.rand(output_len) - 0.5) * 2
+        self.weights = ((np.random.rand(input_len, output_len) - 0.5) * 2).astype(dtype)
+        self.bias = ((np.random.rand(output_len) - 0.5) * 2).astype(dtype)
         self.activation = activation
         self.activation_deriv = activation_deriv
+        # per-layer state of the optimizer (velocities, moments), kept next to the weights
+        self.optimizer_state = {}
+
+    @classmethod
+    def from_params(cls, weights, bias, activation, activation_deriv):
+        """
+        Creates a layer from existing weights and biases, without drawing random ones.
+
+        Args:
+            weights (np.array): weights of the layer, shape (input_len, output_len)
+            bias (np.array): biases of the layer, shape (output_len,)
+            activation (function): activation function to be used for the layer
+            activation_deriv (function): derivative of the activation function
+
+        Returns:
+            The new Layer.
+        """
+        layer = cls.__new__(cls)
+        layer.weights = weights
+        layer.bias = bias
+        layer.activation = activation
+        layer.activation_deriv = activation_deriv
+        layer.optimizer_state = {}
+        return layer
 
     def __calc_derivs(self, output_array, target_array):
         """
         Calculates the derivatives of weights, biases, and inputs with respect to the cost function.
+        Works on a whole mini-batch at once, the weight and bias derivatives are averaged over the batch.
 
         Args:
-            output_array (np.array): output of the layer after applying activation function
-            target_array (np.array): target output for the layer
+            output_array (np.array): output of the layer after applying activation function, shape (batch, output_len)
+            target_array (np.array): target output for the layer, shape (batch, output_len)
 
         Returns:
             Tuple containing the derivatives of weights, biases, and inputs with respect to the cost function.
         """
+        batch_size = len(output_array)
         # derivative of cost with respect to output
         cost_deriv = 2*(output_array - target_array)
         # derivative of activation function with respect to output without activation
         sigmoid_deriv = self.activation_deriv(self.output_no_activation)
+        # derivative of cost with respect to output without activation
+        delta = cost_deriv * sigmoid_deriv
 
-        # derivative of input with respect to cost
-        input_deriv = np.dot(cost_deriv*sigmoid_deriv, self.weights.T)
+        # derivative of input with respect to cost (one row per sample)
+        input_deriv = np.dot(delta, self.weights.T)
         # derivative of bias with respect to cost
-        bias_deriv = (cost_deriv * sigmoid_deriv).flatten()
-        # derivative of weights with respect to cost
-        weights_deriv = np.outer(self.input, (cost_deriv*sigmoid_deriv))
+        bias_deriv = delta.sum(axis=0) / batch_size
+        # derivative of weights with respect to cost, one GEMM for the whole batch
+        weights_deriv = np.dot(self.input.T, delta) / batch_size
 
         return weights_deriv, bias_deriv, input_deriv
 
-    def __update_values(self, weights_deriv, bias_deriv, learning_rate):
+    def __update_values(self, weights_deriv, bias_deriv, optimizer):
         """
         Updates the weights and biases based on their derivatives.
 
         Args:
             weights_deriv (np.array): derivative of the weights with respect to the cost function
             bias_deriv (np.array): derivative of the bias with respect to the cost function
-            learning_rate (float): learning rate for updating weights and biases
+            optimizer (Optimizer): optimizer that applies the update
         """
-        self.weights -= weights_deriv * learning_rate
-        self.bias -= bias_deriv * learning_rate
+        optimizer.update(self, weights_deriv, bias_deriv)
 
     def forward_propagation(self, input_array: np.array):
         """
         Calculates the output of the layer for a given input.
+        The input, the output without activation and the output are kept on the layer, so that
+        backward_propagation can reuse them without running the layer again.
 
         Args:
-            input_array (np.array): input to the layer
+            input_array (np.array): input to the layer, a single sample of shape (input_len,)
+                or a mini-batch of shape (batch, input_len)
 
         Returns:
             Output of the layer after applying the activation function.
         """
+        self.input = input_array
         # calculate dot product of input and weights, add bias term, and apply activation function
         self.output_no_activation = np.dot(
             input_array, self.weights) + self.bias
-        return self.activation(self.output_no_activation)
+        self.output = self.activation(self.output_no_activation)
+        return self.output
 
-    def backward_propagation(self, input_array, target_array, learning_rate):
+    def backward_propagation(self, target_array, optimizer):
         """
         Performs backpropagation on the layer and updates the weights and biases.
+        Uses the input and outputs recorded by the last call to forward_propagation.
 
         Args:
-            input_array (np.array): input to the layer
-            target_array (np.array): target output for the layer
-            learning_rate (float): learning rate for updating weights and biases
+            target_array (np.array): target output for the layer, shape (batch, output_len)
+            optimizer (Optimizer): optimizer used for updating weights and biases
 
         Returns:
             Derivative of the input with respect to the cost function, needed for backpropagation in previous layers.
         """
-        # store input for later use
+        # a single sample is treated as a batch of one
+        input_array = np.atleast_2d(self.input)
+        target_array = np.atleast_2d(target_array)
         self.input = input_array
-        # calculate output using forward propagation
-        output_array = self.forward_propagation(self.input)
+        self.output_no_activation = np.atleast_2d(self.output_no_activation)
+        output_array = np.atleast_2d(self.output)
 
         # calculate derivatives with respect to cost
         weights_deriv, bias_deriv, input_deriv = self.__calc_derivs(
             output_array, target_array)
 
         # update weights and biases based on derivatives
-        self.__update_values(weights_deriv, bias_deriv, learning_rate)
+        self.__update_values(weights_deriv, bias_deriv, optimizer)
 
         # return derivative of input with respect to cost for backpropagation in previous layers
         return input_array - input_deriv
@@ -1,8 +1,16 @@
 import pickle, base64
 from .layer import Layer
+from .optimizers import get_optimizer
+from .training_result import TrainingResult
+from .checkpoint import NETS_DIR, snapshot, write_checkpoint, read_checkpoint
+from . import model_format
+from .frozen_network import FrozenNetwork
+from .activations import activations as activations_by_name, activations_derivs as activations_derivs_by_name
+from ..variables.constants import DTYPE, MIN_DOTS_TO_TEST_USER
 import numpy as np
 import datetime
 import os
+import time
 
 class Network:
     """
@@ -11,26 +19,46 @@ class Network:
     Attributes:
     layers (list): A list of Layer objects representing the layers in the network.
     time (str): A string representing the current time in the format of "%Y-%m-%d_%H-%M-%S".
+    dtype (np.dtype): The floating point type the network computes in (taken from its weights).
 
     Methods:
-    __init__(self, layers_len: list, activations: list, activations_derivs: list, load=False, filename=None) -> None:
+    __init__(self, layers_len: list, activations: list, activations_derivs: list, load=False, filename=None, dtype=DTYPE) -> None:
         Initializes the network by creating a list of layers based on the 'layers_len' list, which specifies the number of neurons in each layer. It also takes 'activations' and 'activations_derivs' lists, which contain activation and derivative functions for each layer. If the 'load' parameter is set to True, it reads a saved network from a file specified by the 'filename' parameter.
 
     calc_cost(self, input_array, target_array) -> float:
         Calculates the cost of the network for a given input and target output.
 
-    train(self, x_train, y_train, learning_rate, cost_to_stop=0.001) -> None:
-        Trains the network using the backpropagation algorithm and the specified 'learning_rate'. It continues training until the total cost falls below the 'cost_to_stop' threshold.
+    train(self, x_train, y_train, learning_rate, cost_to_stop=0.001, batch_size=1, optimizer='sgd', max_epochs=None, max_time=None, patience=None, ...) -> TrainingResult:
+        Trains the network using the backpropagation algorithm, the selected 'optimizer' and the specified 'learning_rate', 'batch_size' samples at a time. It continues training until the total cost falls below the 'cost_to_stop' threshold, or until the epoch/time budget runs out or the cost stops improving.
+
+    train_stream(self, batches, learning_rate, cost_to_stop=0.001, optimizer='sgd', ...) -> TrainingResult:
+        Trains the network like train(), on mini-batches streamed by a generator every epoch.
 
     predict(self, input_array) -> np.ndarray:
         Predicts the output for a given input by propagating it through the layers.
 
+    predict_batch(self, input_array) -> np.ndarray:
+        Predicts the outputs for a 2D array of inputs in one vectorized pass.
+
+    cost_batch(self, input_array, target_array=None) -> np.ndarray:
+        Calculates the cost of every row of a 2D array of inputs in one vectorized pass.
+
     save(self) -> None:
-        Saves the network to a file in a specific directory.
+        Saves the network to a checkpoint file in a specific directory.
+
+    to_bytes(self) -> bytes:
+        Encodes the network in the binary model format (see model_format).
+
+    from_bytes(cls, buffer, copy=False) -> Network:
+        Creates a network from a buffer in the binary model format.
+
+    freeze(self, batch_size=MIN_DOTS_TO_TEST_USER) -> FrozenNetwork:
+        Creates an immutable inference-only copy of the network.
     """
-    def __init__(self, layers_len: list, activations: list, activations_derivs: list, load=False, filename=None) -> None:
+    def __init__(self, layers_len: list, activations: list, activations_derivs: list, load=False, filename=None, dtype=DTYPE) -> None:
         """
         Initializes the network by creating a list of layers based on the 'layers_len' list, which specifies the number of neurons in each layer. It also takes 'activations' and 'activations_derivs' lists, which contain activation and derivative functions for each layer. If the 'load' parameter is set to True, it reads a saved network from a file specified by the 'filename' parameter.
+        A '.npz' file is read as a checkpoint, a file in the binary model format is memory mapped, any other file is read as a legacy base64 pickle of the layers.
         
         Args:
         layers_len (list): A list of integers representing the number of neurons in each layer.
@@ -38,6 +66,7 @@ class Network:
         activations_derivs (list): A list of derivative functions for each layer.
         load (bool): A flag indicating whether to load a saved network from a file.
         filename (str): The name of the file to load the network from.
+        dtype (str or np.dtype): The floating point type of a new network's weights, defaults to DTYPE.
 
         Returns:
         None
@@ -46,15 +75,81 @@ class Network:
             self.layers = []
             for i in range(len(layers_len) - 1):
                 layer = Layer(layers_len[i], layers_len[i+1],
-                            activations[i], activations_derivs[i])
+                            activations[i], activations_derivs[i], dtype)
                 self.layers.append(layer)
+        elif filename.endswith('.npz'):
+            self.layers = Network.__layers_from_params(*read_checkpoint(os.path.join(NETS_DIR, filename)))
         else:
-            with open(f'{os.path.dirname(os.path.abspath(__file__))}\\{filename}','r') as f:
-                self.layers = pickle.loads(base64.b64decode(f.read().encode()))
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+            with open(path, 'rb') as f:
+                is_model = model_format.is_model(f.read(len(model_format.MAGIC)))
+            if is_model:
+                self.layers = Network.__layers_from_params(*model_format.read(path))
+            else:
+                with open(path, 'r') as f:
+                    self.layers = pickle.loads(base64.b64decode(f.read().encode()))
 
         now = datetime.datetime.now()
         self.time = now.strftime("%Y-%m-%d_%H-%M-%S")       
 
+    @staticmethod
+    def __layers_from_params(activation_names, params):
+        """
+        Creates the layers of a network from activation names and (weights, bias) pairs.
+
+        Args:
+        activation_names (list): The name of the activation function of every layer.
+        params (list): A (weights, bias) pair of arrays for every layer.
+
+        Returns:
+        list: The layers.
+        """
+        return [Layer.from_params(weights, bias, activations_by_name[name], activations_derivs_by_name[name])
+                for name, (weights, bias) in zip(activation_names, params)]
+
+    @classmethod
+    def from_bytes(cls, buffer, copy=False):
+        """
+        Creates a network from a buffer in the binary model format.
+
+        Args:
+        buffer (bytes): The encoded model.
+        copy (bool): By default the weights are read-only views into 'buffer' (enough for prediction),
+            pass True to get writable copies that can be trained.
+
+        Returns:
+        Network: The decoded network.
+        """
+        activation_names, params = model_format.decode(buffer)
+        if copy:
+            params = [(weights.copy(), bias.copy()) for weights, bias in params]
+
+        network = cls.__new__(cls)
+        network.layers = Network.__layers_from_params(activation_names, params)
+        network.time = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        return network
+
+    def to_bytes(self):
+        """
+        Encodes the network in the binary model format: a versioned header with the architecture and
+        activation names followed by the contiguous weights and biases. Training state is not included.
+
+        Returns:
+        bytes: The encoded network.
+        """
+        return model_format.encode([layer.activation.__name__ for layer in self.layers],
+                                   [(layer.weights, layer.bias) for layer in self.layers])
+
+    @property
+    def dtype(self):
+        """
+        The floating point type the network computes in, taken from the weights so it also holds for loaded networks.
+
+        Returns:
+        np.dtype: The dtype of the network's weights.
+        """
+        return self.layers[0].weights.dtype
+
     def calc_cost(self, input_array, target_array):
         """
         Calculates the cost of the network for a given input and target output.
@@ -69,68 +164,269 @@ class Network:
         output = self.predict(input_array)
         return np.sum(np.square(output - (target_array)))
 
-    def train(self, x_train, y_train, learning_rate, cost_to_stop=0.001):
+    def __train_on_batch(self, input_array, target, optimizer, weights=None, weight_scale=1.0):
+        """
+        Runs one training step (a forward pass and a backward pass) on a mini-batch.
+
+        Args:
+        input_array (np.ndarray): A 2D numpy array holding the inputs of the batch.
+        target (np.ndarray): A 2D numpy array holding the target outputs of the batch.
+        optimizer (Optimizer): The optimizer that updates the weights.
+        weights (np.ndarray): The weight of every row of the batch, None to weigh them equally.
+        weight_scale (float): The mean weight of the whole dataset, the weights are divided by it in the gradients.
+
+        Returns:
+        float: The summed (weighted) cost of the batch, taken before the weights are updated.
+        """
+        # one forward pass, every layer keeps its input and activations for backpropagation
+        output = input_array
+        for layer in self.layers:
+            output = layer.forward_propagation(output)
+
+        # the cost of the step is taken from the same output, before the weights are updated
+        if weights is None:
+            cost = np.sum(np.square(output - target))
+        else:
+            cost = np.sum(weights * np.sum(np.square(output - target), axis=1))
+            # the error of every row is scaled by its weight relative to the dataset's mean weight (so the size
+            # of a step does not depend on the scale of the weights, and every batch keeps its share of the
+            # epoch's gradient), by moving the target of the output layer
+            target = output - (weights / weight_scale)[:, None] * (output - target)
+
+        for layer in reversed(self.layers):
+            target = layer.backward_propagation(target, optimizer)
+
+        return cost
+
+    @staticmethod
+    def __snapshot_layer(layer):
+        """
+        Copies the weights, the bias and the optimizer state of a layer, which the optimizers update in place.
+
+        Args:
+        layer (Layer): The layer.
+
+        Returns:
+        tuple: The copied weights, bias and optimizer state.
+        """
+        state = getattr(layer, 'optimizer_state', {})
+        return layer.weights.copy(), layer.bias.copy(), \
+            {key: value.copy() if isinstance(value, np.ndarray) else value for key, value in state.items()}
+
+    @staticmethod
+    def __mean_weight(batches):
+        """
+        Computes the mean weight of a streamed dataset, with one pass over its batches.
+
+        Args:
+        batches (callable): The batches given to train_stream().
+
+        Returns:
+        float: The mean weight of the samples, 1.0 when their weights sum to 0.
+        """
+        total = 0.0
+        count = 0
+        for batch in batches():
+            total += float(np.sum(batch[2]))
+            count += len(batch[2])
+        return total / count if count and total > 0 else 1.0
+
+    def train(self, x_train, y_train, learning_rate, cost_to_stop=0.001, batch_size=1, optimizer='sgd',
+              max_epochs=None, max_time=None, patience=None, min_delta=0.0, plateau_action='stop',
+              lr_factor=0.5, min_learning_rate=1e-6, checkpoint=None, sample_weights=None):
         """
         Trains the network using the backpropagation algorithm and the specified 'learning_rate'. It continues training until the total cost falls below the 'cost_to_stop' threshold.
+        The training data is walked in mini-batches of 'batch_size' samples, every layer handles a whole batch as one matrix.
+        The weights are updated by the selected optimizer, which keeps its per-layer state on the layers.
+        Training is bounded by an optional epoch budget and wall-clock budget. When the cost has not improved by
+        'min_delta' for 'patience' epochs, training either stops or the learning rate is reduced (see 'plateau_action').
+        When training ends the weights of the best epoch are restored, together with the optimizer state of that epoch.
+        The optimizer state is not saved with the network (see to_bytes), so a loaded network starts with a fresh one.
+        With 'sample_weights' every sample counts as many times as its weight, in the gradients and in the cost.
 
         Args:
         x_train (np.ndarray): A 2D numpy array representing the training inputs.
         y_train (np.ndarray): A 2D numpy array representing the target outputs for each training input.
-        learning_rate (float): The learning rate used for training.
+        learning_rate (float): The learning rate used for training, None for the optimizer's default.
         cost_to_stop (float): The threshold value for the total cost of the network, below which training will stop.
+        batch_size (int): The number of samples propagated through the network together in every training step.
+        optimizer (str or Optimizer): The optimizer name ('sgd', 'momentum', 'rmsprop', 'adam') or an Optimizer object.
+        max_epochs (int): The maximum number of epochs to run, None for no limit.
+        max_time (float): The maximum training time in seconds, None for no limit.
+        patience (int): The number of epochs without improvement that count as a plateau, None to never detect one.
+        min_delta (float): The minimal decrease of the cost that counts as an improvement.
+        plateau_action (str): 'stop' to stop on a plateau, 'reduce_lr' to multiply the learning rate by 'lr_factor'
+            (training stops once it falls below 'min_learning_rate').
+        lr_factor (float): The factor the learning rate is multiplied by on a plateau.
+        min_learning_rate (float): The learning rate below which a plateau stops training.
+        checkpoint (CheckpointManager): Saves checkpoints in the background while training, None to not save.
+        sample_weights (np.ndarray): A 1D numpy array holding the weight of every training sample, None to weigh them equally.
 
         Returns:
-        None
+        TrainingResult: The trained network, the reason training stopped and the best cost reached.
         """
-        total_cost = 1
-        length = len(x_train)
+        x_train = np.asarray(x_train, dtype=self.dtype)
+        y_train = np.asarray(y_train, dtype=self.dtype)
+        if sample_weights is not None:
+            sample_weights = np.asarray(sample_weights, dtype=self.dtype)
+
+        def batches():
+            for start in range(0, len(x_train), batch_size):
+                if sample_weights is None:
+                    yield x_train[start:start + batch_size], y_train[start:start + batch_size]
+                else:
+                    yield x_train[start:start + batch_size], y_train[start:start + batch_size], \
+                        sample_weights[start:start + batch_size]
+
+        # one scale for the whole dataset, so every batch keeps its share of the epoch's gradient
+        weight_scale = None
+        if sample_weights is not None and len(sample_weights) > 0 and sample_weights.sum() > 0:
+            weight_scale = float(sample_weights.mean())
+        return self.train_stream(batches, learning_rate, cost_to_stop, optimizer, max_epochs, max_time, patience,
+                                 min_delta, plateau_action, lr_factor, min_learning_rate, checkpoint, weight_scale)
+
+    def train_stream(self, batches, learning_rate, cost_to_stop=0.001, optimizer='sgd', max_epochs=None,
+                     max_time=None, patience=None, min_delta=0.0, plateau_action='stop', lr_factor=0.5,
+                     min_learning_rate=1e-6, checkpoint=None, weight_scale=None):
+        """
+        Trains the network like train(), on mini-batches produced by a generator instead of arrays held in
+        memory, so the memory used is bounded by the batch size instead of the dataset size.
+
+        Args:
+        batches (callable): Called at the start of every epoch, returns an iterable of (inputs, targets)
+            mini-batches (2D numpy arrays) covering the training data once, or of (inputs, targets, weights)
+            mini-batches to weigh the samples (see train()).
+        learning_rate (float): The learning rate used for training, None for the optimizer's default.
+        weight_scale (float): The mean weight of the whole dataset, every weight is divided by it in the gradients.
+            None to compute it with one extra pass over the batches (only done when the batches are weighted).
+        The other arguments are the same as in train().
+
+        Returns:
+        TrainingResult: The trained network, the reason training stopped and the best cost reached.
+        """
+        optimizer = get_optimizer(optimizer, learning_rate)
         times = 0
+        start_time = time.time()
 
-        while total_cost > cost_to_stop:
+        best_cost = float('inf')
+        best_params = None
+        epochs_without_improvement = 0
+        reason = None
+
+        while reason is None:
             total_cost = 0
-            for i, input_array in enumerate(x_train):
-                target = y_train[i]
+            length = 0
+            for batch in batches():
+                x_batch, y_batch = batch[0], batch[1]
+                w_batch = np.asarray(batch[2], dtype=self.dtype) if len(batch) > 2 else None
+                if w_batch is not None and weight_scale is None:
+                    # the first weighted batch, the scale is needed before the first step
+                    weight_scale = Network.__mean_weight(batches)
+                total_cost += self.__train_on_batch(
+                    np.asarray(x_batch, dtype=self.dtype), np.asarray(y_batch, dtype=self.dtype), optimizer, w_batch,
+                    weight_scale)
+                # the cost is averaged over the samples the weighted rows stand for
+                length += len(x_batch) if w_batch is None else float(w_batch.sum())
 
-                output = input_array
-                outputs = []
-                for layer in self.layers:
-                    outputs.append(output)
-                    output = layer.forward_propagation(output)
+            total_cost = float(total_cost / length)
+            times += 1
 
-                for j, layer in enumerate(reversed(self.layers)):
-                    target = layer.backward_propagation(
-                        outputs[-j-1], target, learning_rate)
+            if total_cost < best_cost - min_delta:
+                epochs_without_improvement = 0
+            else:
+                epochs_without_improvement += 1
+            if total_cost < best_cost:
+                best_cost = total_cost
+                best_params = [Network.__snapshot_layer(layer) for layer in self.layers]
 
-                total_cost += self.calc_cost(input_array, y_train[i])
+            if checkpoint is not None:
+                checkpoint.maybe_save(self, times)
 
-            total_cost /= length
-            learning_rate = total_cost / 1.5
-            times += 1
+            print(f"{times} times | total cost: {total_cost} | learning rate: {optimizer.learning_rate}")
 
-            self.save()
+            if total_cost <= cost_to_stop:
+                reason = TrainingResult.STOP_CONVERGED
+            elif max_epochs is not None and times >= max_epochs:
+                reason = TrainingResult.STOP_MAX_EPOCHS
+            elif max_time is not None and time.time() - start_time >= max_time:
+                reason = TrainingResult.STOP_MAX_TIME
+            elif patience is not None and epochs_without_improvement >= patience:
+                if plateau_action == 'reduce_lr' and optimizer.learning_rate * lr_factor >= min_learning_rate:
+                    optimizer.learning_rate *= lr_factor
+                    epochs_without_improvement = 0
+                else:
+                    reason = TrainingResult.STOP_PLATEAU
 
-            print(f"{times} times | total cost: {total_cost} | learning rate: {learning_rate}")
+        # keep the weights of the best epoch, with the optimizer state (moments, velocities) they were reached with
+        if best_params is not None and best_cost < total_cost:
+            for layer, (weights, bias, state) in zip(self.layers, best_params):
+                layer.weights, layer.bias, layer.optimizer_state = weights, bias, state
+
+        return TrainingResult(self, reason, best_cost, total_cost, times, time.time() - start_time)
 
     def predict(self, input_array):
         """
         Predicts the output for a given input by propagating it through the layers.
 
         Args:
-        input_array (np.ndarray): A 1D numpy array representing the input to the network.
+        input_array (np.ndarray): A 1D numpy array representing the input to the network, or a 2D array holding a batch of inputs.
 
         Returns:
-        np.ndarray: A 1D numpy array representing the output of the network for the given input.
+        np.ndarray: A numpy array representing the output of the network for the given input, with the same number of dimensions.
         """
         for layer in self.layers:
             input_array = layer.forward_propagation(input_array)
         return input_array
 
+    def predict_batch(self, input_array):
+        """
+        Predicts the outputs for many inputs at once, every layer handles the whole batch as one matrix.
+
+        Args:
+        input_array (np.ndarray): A 2D numpy array of shape (N, input_len) holding one input per row.
+
+        Returns:
+        np.ndarray: A 2D numpy array of shape (N, output_len) holding the output for every row.
+        """
+        return self.predict(np.atleast_2d(np.asarray(input_array, dtype=self.dtype)))
+
+    def cost_batch(self, input_array, target_array=None):
+        """
+        Calculates the cost of the network for every row of a batch of inputs in one vectorized pass.
+
+        Args:
+        input_array (np.ndarray): A 2D numpy array of shape (N, input_len) holding one input per row.
+        target_array (np.ndarray): A 2D numpy array of shape (N, output_len) holding the desired outputs.
+            Defaults to the input itself (reconstruction error of an autoencoder).
+
+        Returns:
+        np.ndarray: A 1D numpy array of length N with the cost of every row.
+        """
+        input_array = np.atleast_2d(np.asarray(input_array, dtype=self.dtype))
+        if target_array is None:
+            target_array = input_array
+        output = self.predict(input_array)
+        return np.sum(np.square(output - target_array), axis=1)
+
+    def freeze(self, batch_size=MIN_DOTS_TO_TEST_USER):
+        """
+        Creates an immutable inference-only copy of the network, with preallocated workspace buffers
+        and in-place bias and activation, that is safe to share between threads.
+
+        Args:
+        batch_size (int): The number of rows the workspaces are allocated for.
+
+        Returns:
+        FrozenNetwork: The frozen network.
+        """
+        return FrozenNetwork(self.layers, batch_size)
+
     def save(self):
         """
-        Saves the network to a file in a specific directory.
+        Saves the network to a checkpoint file in a specific directory (see CheckpointManager for saving while training).
 
         Returns:
         None
         """
-        with open(f'{os.path.dirname(os.path.abspath(__file__))}\\nets\\network_{self.time}.net','w') as f:
-            f.write(base64.b64encode(pickle.dumps(self.layers)).decode())
+        os.makedirs(NETS_DIR, exist_ok=True)
+        write_checkpoint(os.path.join(NETS_DIR, f'network_{self.time}.npz'), snapshot(self))
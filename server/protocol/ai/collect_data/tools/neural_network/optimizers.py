@@ -0,0 +1,183 @@
+import math
+import numpy as np
+
+
+class Optimizer:
+    """
+    Base class of the optimizers used to update the weights and biases of a layer.
+
+    The optimizer itself only holds hyper parameters, any per-layer state (velocities, moments, step count)
+    is kept in the 'optimizer_state' dictionary of the layer, next to its weights.
+
+    Attributes:
+    learning_rate (float): The step size used for the updates.
+    """
+    default_learning_rate = 0.1
+
+    def __init__(self, learning_rate: float = None) -> None:
+        """
+        Initializes the optimizer.
+
+        Args:
+        learning_rate (float): The step size used for the updates, defaults to the optimizer's default_learning_rate.
+        """
+        if learning_rate is None:
+            learning_rate = self.default_learning_rate
+        self.learning_rate = learning_rate
+
+    @staticmethod
+    def _state(layer) -> dict:
+        """
+        Returns the optimizer state of a layer, creating it for layers that were built before optimizers existed.
+
+        Args:
+        layer (Layer): The layer whose state is needed.
+
+        Returns:
+        dict: The optimizer state of the layer.
+        """
+        if not hasattr(layer, 'optimizer_state'):
+            layer.optimizer_state = {}
+        return layer.optimizer_state
+
+    def update(self, layer, weights_deriv, bias_deriv) -> None:
+        """
+        Updates the weights and biases of a layer based on their derivatives.
+
+        This method should be overridden in a subclass of Optimizer.
+
+        Args:
+        layer (Layer): The layer to update.
+        weights_deriv (np.ndarray): derivative of the weights with respect to the cost function
+        bias_deriv (np.ndarray): derivative of the bias with respect to the cost function
+        """
+        raise Exception('Override required!')
+
+
+class SGD(Optimizer):
+    """
+    Plain stochastic gradient descent: w -= learning_rate * dw.
+    """
+    default_learning_rate = 0.1
+
+    def update(self, layer, weights_deriv, bias_deriv) -> None:
+        layer.weights -= weights_deriv * self.learning_rate
+        layer.bias -= bias_deriv * self.learning_rate
+
+
+class Momentum(Optimizer):
+    """
+    Gradient descent with momentum, a velocity per weight accumulates the past gradients.
+    """
+    default_learning_rate = 0.1
+
+    def __init__(self, learning_rate: float = None, momentum: float = 0.9) -> None:
+        """
+        Args:
+        learning_rate (float): The step size used for the updates.
+        momentum (float): The fraction of the previous velocity kept in every step.
+        """
+        super().__init__(learning_rate)
+        self.momentum = momentum
+
+    def update(self, layer, weights_deriv, bias_deriv) -> None:
+        state = self._state(layer)
+        if 'weights_velocity' not in state:
+            state['weights_velocity'] = np.zeros_like(layer.weights)
+            state['bias_velocity'] = np.zeros_like(layer.bias)
+
+        for param, deriv, velocity in ((layer.weights, weights_deriv, state['weights_velocity']),
+                                       (layer.bias, bias_deriv, state['bias_velocity'])):
+            velocity *= self.momentum
+            velocity -= deriv * self.learning_rate
+            param += velocity
+
+
+class RMSProp(Optimizer):
+    """
+    RMSProp, every weight's step is divided by a running average of its squared gradients.
+    """
+    default_learning_rate = 0.001
+
+    def __init__(self, learning_rate: float = None, decay: float = 0.9, epsilon: float = 1e-7) -> None:
+        """
+        Args:
+        learning_rate (float): The step size used for the updates.
+        decay (float): The decay rate of the running average of the squared gradients.
+        epsilon (float): A small number that keeps the division stable.
+        """
+        super().__init__(learning_rate)
+        self.decay = decay
+        self.epsilon = epsilon
+
+    def update(self, layer, weights_deriv, bias_deriv) -> None:
+        state = self._state(layer)
+        if 'weights_square' not in state:
+            state['weights_square'] = np.zeros_like(layer.weights)
+            state['bias_square'] = np.zeros_like(layer.bias)
+
+        for param, deriv, square in ((layer.weights, weights_deriv, state['weights_square']),
+                                     (layer.bias, bias_deriv, state['bias_square'])):
+            square *= self.decay
+            square += (1 - self.decay) * np.square(deriv)
+            param -= self.learning_rate * deriv / (np.sqrt(square) + self.epsilon)
+
+
+class Adam(Optimizer):
+    """
+    Adam, combines momentum (first moment) and RMSProp (second moment) with bias correction.
+    """
+    default_learning_rate = 0.001
+
+    def __init__(self, learning_rate: float = None, beta1: float = 0.9, beta2: float = 0.999, epsilon: float = 1e-7) -> None:
+        """
+        Args:
+        learning_rate (float): The step size used for the updates.
+        beta1 (float): The decay rate of the first moment.
+        beta2 (float): The decay rate of the second moment.
+        epsilon (float): A small number that keeps the division stable.
+        """
+        super().__init__(learning_rate)
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+
+    def update(self, layer, weights_deriv, bias_deriv) -> None:
+        state = self._state(layer)
+        if 'weights_m' not in state:
+            state['step'] = 0
+            state['weights_m'] = np.zeros_like(layer.weights)
+            state['weights_v'] = np.zeros_like(layer.weights)
+            state['bias_m'] = np.zeros_like(layer.bias)
+            state['bias_v'] = np.zeros_like(layer.bias)
+
+        state['step'] += 1
+        # bias correction folded into the step size
+        step_size = self.learning_rate * math.sqrt(1 - self.beta2 ** state['step']) / (1 - self.beta1 ** state['step'])
+
+        for param, deriv, m, v in ((layer.weights, weights_deriv, state['weights_m'], state['weights_v']),
+                                   (layer.bias, bias_deriv, state['bias_m'], state['bias_v'])):
+            m *= self.beta1
+            m += (1 - self.beta1) * deriv
+            v *= self.beta2
+            v += (1 - self.beta2) * np.square(deriv)
+            param -= step_size * m / (np.sqrt(v) + self.epsilon)
+
+
+optimizers = {'sgd': SGD, 'momentum': Momentum, 'rmsprop': RMSProp, 'adam': Adam}
+
+
+def get_optimizer(optimizer, learning_rate: float = None) -> Optimizer:
+    """
+    Returns an optimizer object from its name, or the object itself if it already is one.
+
+    Args:
+    optimizer (str or Optimizer): The name of the optimizer (a key of 'optimizers') or an Optimizer object.
+    learning_rate (float): The learning rate of an optimizer created by name, defaults to the optimizer's default.
+
+    Returns:
+    Optimizer: The optimizer object.
+    """
+    if isinstance(optimizer, Optimizer):
+        return optimizer
+    return optimizers[optimizer](learning_rate)
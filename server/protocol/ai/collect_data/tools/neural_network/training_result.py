@@ -0,0 +1,28 @@
+class TrainingResult:
+    """
+    The outcome of a call to Network.train.
+
+    Attributes:
+    network (Network): The trained network (holding the weights of the best epoch).
+    reason (str): Why training stopped, one of the STOP_* constants of this class.
+    best_cost (float): The lowest epoch cost reached.
+    last_cost (float): The cost of the last epoch that ran.
+    epochs (int): The number of epochs that ran.
+    elapsed (float): The training time in seconds.
+    """
+    STOP_CONVERGED = 'converged'    # the cost fell below cost_to_stop
+    STOP_MAX_EPOCHS = 'max_epochs'  # the epoch budget was used up
+    STOP_MAX_TIME = 'max_time'      # the wall-clock budget was used up
+    STOP_PLATEAU = 'plateau'        # the cost stopped improving
+
+    def __init__(self, network, reason: str, best_cost: float, last_cost: float, epochs: int, elapsed: float) -> None:
+        self.network = network
+        self.reason = reason
+        self.best_cost = best_cost
+        self.last_cost = last_cost
+        self.epochs = epochs
+        self.elapsed = elapsed
+
+    def __repr__(self) -> str:
+        return (f"TrainingResult(reason={self.reason}, best_cost={self.best_cost}, last_cost={self.last_cost}, "
+                f"epochs={self.epochs}, elapsed={self.elapsed:.1f}s)")
@@ -0,0 +1,32 @@
+import numpy as np
+
+# Reservoir sampling (Algorithm R) of the stream of all the ingested dots, vectorized over a batch.
+# The reservoir holds 'size' slots. The first 'size' dots fill them in order, after that the dot at
+# position i of the stream (0-based) replaces the dot in a uniformly drawn slot of [0, i] if that slot
+# exists, so at any time every dot seen so far is in the reservoir with the same probability.
+
+rng = np.random.default_rng()
+
+
+def reservoir_slots(seen: int, count: int, size: int):
+    """
+    Draws the reservoir slots of a batch of dots.
+
+    Args:
+        seen (int): The number of dots in the stream before the batch.
+        count (int): The number of dots in the batch.
+        size (int): The number of slots in the reservoir.
+
+    Returns:
+        tuple: The slots to write (np.ndarray) and the index of the dot of the batch that goes to each of them.
+               When several dots of the batch draw the same slot, only the last one is kept, as if the
+               batch was sampled one dot at a time.
+    """
+    positions = np.arange(seen, seen + count)
+    slots = np.where(positions < size, positions, rng.integers(0, positions + 1))
+    indices = np.flatnonzero(slots < size)
+    slots = slots[indices]
+
+    # the last draw of every slot wins
+    unique_slots, last = np.unique(slots[::-1], return_index=True)
+    return unique_slots, indices[len(indices) - 1 - last]
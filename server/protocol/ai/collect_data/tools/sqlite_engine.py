@@ -0,0 +1,941 @@
+import os
+import sqlite3
+import threading
+from .basic_classes.user import User
+from .storage_engine import StorageEngine, stratified_indices
+from .migrations import migrate
+from .statements import STATEMENTS
+from .reservoir import reservoir_slots
+from .variables.constants import DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_STATEMENT_CACHE_SIZE, DB_BUSY_TIMEOUT, \
+    MOTION_STORAGE, STREAM_CHUNK_SIZE, RETENTION_CHUNK_DOTS
+import numpy as np
+
+# default path of the database file
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'data.db')
+
+
+class SQLiteEngine(StorageEngine):
+    """
+    A storage engine (see StorageEngine) that keeps everything in a SQLite database file.
+
+    By default every method opens and closes its own connection. While the connection pool is open
+    (open_pool(), done by MainServer.activate) every thread keeps one persistent connection,
+    configured once (WAL journal, synchronous=NORMAL, page cache and mmap sizes), and open_DB/close_DB
+    only borrow and return it. The connection and cursor of a call are kept per thread, so one engine
+    serves all the threads.
+
+    The first connection of the engine brings the schema up to date (see migrations.py).
+
+    Dots are stored either as a row per dot (motion) or as a packed float32 blob per ingested batch
+    (motion_chunks), as set by MOTION_STORAGE. The readers always combine both layouts. A dot's
+    "rowid" (the watermarks) is its sequence number, shared by both layouts. Every dot also has a weight,
+    the number of identical stationary dots it stands for (see DataUtils.dedup_dots).
+
+    Attributes:
+    path (str): The path of the database file.
+    conn (sqlite3.Connection): The database connection object of the calling thread.
+    cursor (sqlite3.Cursor): The database cursor object of the calling thread.
+    """
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self.local = threading.local()
+
+        # set once the migrations were applied to the database by this engine
+        self.schema_ready = False
+        self.schema_lock = threading.Lock()
+
+        # the connection pool: thread ident -> (thread, connection), None while the pool is closed
+        self.pool = None
+        self.pool_pid = None
+        self.pool_lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return getattr(self.local, 'conn', None)
+
+    @conn.setter
+    def conn(self, conn: sqlite3.Connection):
+        self.local.conn = conn
+
+    @property
+    def cursor(self) -> sqlite3.Cursor:
+        return getattr(self.local, 'cursor', None)
+
+    @cursor.setter
+    def cursor(self, cursor: sqlite3.Cursor):
+        self.local.cursor = cursor
+
+    def open_pool(self):
+        """
+        Opens the connection pool, from now on every thread reuses one persistent connection.
+        """
+        with self.pool_lock:
+            if self.pool is None:
+                self.pool = {}
+                self.pool_pid = os.getpid()
+
+    def close_pool(self):
+        """
+        Closes the connection pool and every pooled connection, methods go back to a connection per call.
+        """
+        with self.pool_lock:
+            pool, self.pool = self.pool, None
+        if pool:
+            for thread, conn in pool.values():
+                conn.close()
+
+    def __connect(self) -> sqlite3.Connection:
+        """
+        Opens a new connection to the database file, creating its directory if needed.
+
+        Returns:
+        sqlite3.Connection: The connection.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT, check_same_thread=False,
+                               cached_statements=DB_STATEMENT_CACHE_SIZE)
+
+    def __pooled_connection(self):
+        """
+        Returns the persistent connection of the calling thread, creating and configuring it on first use.
+        Connections of threads that have ended are closed on the way.
+
+        Returns:
+        sqlite3.Connection: The connection, or None if the pool is closed (or was opened by another process).
+        """
+        with self.pool_lock:
+            if self.pool is None or self.pool_pid != os.getpid():
+                return None
+            entry = self.pool.get(threading.get_ident())
+            if entry is not None and entry[0] is threading.current_thread():
+                return entry[1]
+
+            for ident, (thread, conn) in list(self.pool.items()):
+                if not thread.is_alive():
+                    conn.close()
+                    del self.pool[ident]
+
+            conn = self.__connect()
+            conn.execute("PRAGMA journal_mode = WAL;")
+            conn.execute("PRAGMA synchronous = NORMAL;")
+            conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB};")
+            conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE};")
+            self.pool[threading.get_ident()] = (threading.current_thread(), conn)
+            return conn
+
+    def open_DB(self):
+        """
+        Opens a connection to the database file at self.path (or borrows the pooled
+        connection of the calling thread). Sets the connection object to the
+        self.conn attribute and sets the cursor object to the self.cursor attribute.
+        """
+        self.conn = self.__pooled_connection()
+        if self.conn is None:
+            self.conn = self.__connect()
+        self.cursor = self.conn.cursor()
+        if not self.schema_ready:
+            with self.schema_lock:
+                if not self.schema_ready:
+                    migrate(self.conn)
+                    self.schema_ready = True
+
+    def __execute(self, name: str, params=()):
+        """
+        Executes a statement of the registry (statements.py) with bound parameters.
+
+        Args:
+        name (str): The name of the statement.
+        params (tuple): The values bound to the statement's parameters.
+
+        Returns:
+        sqlite3.Cursor: The cursor, to fetch the results from.
+        """
+        return self.cursor.execute(STATEMENTS[name], params)
+
+    def __executemany(self, name: str, rows):
+        """
+        Executes a statement of the registry (statements.py) once for every row of bound parameters.
+
+        Args:
+        name (str): The name of the statement.
+        rows (iterable): The values bound to the statement's parameters, one tuple per execution.
+
+        Returns:
+        sqlite3.Cursor: The cursor.
+        """
+        return self.cursor.executemany(STATEMENTS[name], rows)
+
+    def __update_stats(self, id: int, x, y, v, last_rowid: int):
+        """
+        Adds inserted dots to the running statistics of a user, in the current transaction.
+
+        Args:
+        id (int): The ID of the user.
+        x, y, v (np.ndarray): The values of the inserted dots.
+        last_rowid (int): The motion rowid of the last inserted dot.
+        """
+        values = [id, len(x)]
+        for column in (x, y, v):
+            values += [float(np.min(column)), float(np.max(column)), float(np.sum(column))]
+        values.append(last_rowid)
+
+        self.__execute('update_stats', values)
+
+    def get_user_stats(self, id: int):
+        """
+        Retrieves the running statistics of a user's dots.
+
+        Args:
+        id (int): The ID of the user.
+
+        Returns:
+        dict: The count, min/max/sum of x, y and v and the rowid of the last inserted dot,
+              or False if the user has no dots.
+        """
+        self.open_DB()
+        res = self.__execute('get_user_stats', (id,))
+        stats = res.fetchone()
+        columns = [column[0] for column in res.description]
+
+        self.close_DB()
+        if stats is None:
+            return False
+        return dict(zip(columns, stats))
+
+    def close_DB(self):
+        """
+        Closes the database connection (a pooled connection is kept open for the next call of the thread).
+        """
+        self.__release(self.conn, self.cursor)
+
+    def __release(self, conn: sqlite3.Connection, cursor: sqlite3.Cursor):
+        """
+        Closes a cursor and its connection, unless the connection is the pooled connection of the thread.
+        """
+        cursor.close()
+        with self.pool_lock:
+            pooled = self.pool is not None and self.pool_pid == os.getpid() \
+                and self.pool.get(threading.get_ident(), (None, None))[1] is conn
+        if not pooled:
+            conn.close()
+
+    def commit(self):
+        """
+        Commits any changes made to the database since the last commit.
+        """
+        self.conn.commit()
+
+    def dump_neural_network(self, id: int, network):
+        """
+        Serializes a neural network object and stores it in the database.
+
+        Args:
+        id (int): The ID of the network.
+        network (Network or bytes): The neural network object to be serialized, or a network
+                                    already encoded in the binary model format.
+
+        Returns:
+        bool: True if the operation is successful.
+        """
+        self.open_DB()
+
+        # Serialize the network in the binary model format (header + contiguous weights)
+        serialized_network = network if isinstance(network, bytes) else network.to_bytes()
+
+        # Insert or update the serialized network in the database, the model is bound as a blob
+        self.__execute('dump_neural_network', (id, sqlite3.Binary(serialized_network)))
+
+        self.commit()
+        self.close_DB()
+
+        return True
+
+    def get_email(self, id: int) -> str:
+        """
+        Retrieves the email associated with a user ID.
+
+        Args:
+        id (int): The ID of the user.
+
+        Returns:
+        str: The email address associated with the user ID, or False if the
+             user ID is not found.
+        """
+        self.open_DB()
+
+        res = self.__execute('get_email', (id,))
+        email = res.fetchall()
+        if email == []:
+            email = False
+        else:
+            email = email[0][0]
+
+        self.close_DB()
+        return email
+
+    def get_neural_network(self, id:int):
+        """
+        Retrieves the serialized neural network associated with a network ID.
+
+        Args:
+        id (int): The ID of the network.
+
+        Returns:
+        bytes: The network in the binary model format (a base64 pickle string for
+               networks stored by older versions), or False if the network ID is not found.
+        """
+        self.open_DB()
+        res = self.__execute('get_neural_network', (id,))
+        network = res.fetchall()
+        if network == []:
+            network = False
+        else:
+            network = network[0][0]
+        
+        self.close_DB()
+        if not network:
+            return network
+        return network
+
+    def has_neural_network(self, id: int) -> bool:
+        """
+        Checks whether a neural network is stored for a network ID, without reading it.
+
+        Args:
+        id (int): The ID of the network.
+
+        Returns:
+        bool: True if a network is stored for the ID.
+        """
+        self.open_DB()
+        res = self.__execute('has_neural_network', (id,))
+        exists = res.fetchone() is not None
+
+        self.close_DB()
+        return exists
+
+    def get_training_watermark(self, id: int) -> int:
+        """
+        Retrieves the last motion rowid the user's network was trained on.
+
+        Args:
+        id (int): The ID of the user.
+
+        Returns:
+        int: The watermark, or 0 if the user was never trained.
+        """
+        self.open_DB()
+        res = self.__execute('get_training_watermark', (id,))
+        watermark = res.fetchone()
+
+        self.close_DB()
+        return watermark[0] if watermark is not None else 0
+
+    def set_training_watermark(self, id: int, watermark: int) -> bool:
+        """
+        Stores the last motion rowid the user's network was trained on.
+
+        Args:
+        id (int): The ID of the user.
+        watermark (int): The rowid of the last dot used for training.
+
+        Returns:
+        bool: True if the operation is successful.
+        """
+        self.open_DB()
+        self.__execute('set_training_watermark', (id, watermark))
+
+        self.commit()
+        self.close_DB()
+        return True
+
+    def count_dots_since(self, id: int, watermark: int) -> int:
+        """
+        Counts the dots inserted for a user after a watermark.
+
+        Args:
+        id (int): The ID of the user.
+        watermark (int): The motion rowid to count from (exclusive).
+
+        Returns:
+        int: The number of dots.
+        """
+        self.open_DB()
+        res = self.__execute('count_dots_since', (id, watermark))
+        cnt = res.fetchone()[0]
+        res = self.__execute('count_chunk_dots_since', (id, watermark))
+        cnt += res.fetchone()[0]
+
+        self.close_DB()
+        return cnt
+
+    def get_user_password(self, username):
+        """"
+        if user exist return his password
+        if not return false
+        """
+        self.open_DB()
+
+        res = self.__execute('get_user_password', (username,))
+        password = res.fetchall()
+        if password == []:
+            password = False
+        else:
+            password = password[0][0]
+
+
+        self.close_DB()
+        return password
+
+    def insert_user(self, u: User):
+        """
+        Inserts a new user into the 'users' table, the database assigns the new id.
+
+        Args:
+            - u: a User object representing the user to insert.
+
+        Returns:
+            - True if the insertion was successful, False otherwise (the username is taken).
+        """
+        self.open_DB()
+
+        try:
+            res = self.__execute('insert_user', (u.username, u.password, u.email))
+            self.commit()
+        except sqlite3.IntegrityError:
+            # the usernames are unique
+            self.conn.rollback()
+            return False
+        finally:
+            self.close_DB()
+
+        return True
+
+    def get_id(self, username):
+        """
+        Retrieves the id of a user given their username.
+
+        Args:
+            - username: the username of the user to retrieve.
+
+        Returns:
+            - id: the id of the user.
+        """
+        self.open_DB()
+        res = self.__execute('get_id', (username,))
+        id = res.fetchall()[0][0]
+        self.close_DB()
+        return id
+    
+    def get_all_id(self):
+        """
+        Retrieve all ids from the "users" table in the database.
+
+        Returns:
+        - list: A list of all the ids in the "users" table.
+        """
+        self.open_DB()
+        res = self.__execute('get_all_id')
+        id = res.fetchall()
+        self.close_DB()
+        return [i[0] for i in id]
+
+
+    def __get_id(self, username):
+        """
+        Retrieve the id of a user with the given username from the "users" table.
+
+        Args:
+        - username (str): The username of the user.
+
+        Returns:
+        - int: The id of the user with the given username.
+        """
+        res = self.__execute('get_id', (username,))
+        id = res.fetchall()[0][0]
+        return id
+
+    def get_user_data(self, id):
+        """
+        Retrieve the x, y, and v values for a given id from the "motion" and "motion_chunks" tables in the database.
+
+        Args:
+        - id (int): The id of the user to retrieve data for.
+
+        Returns:
+        - numpy.ndarray: A NumPy array containing the x, y, and v values for the given id, in insertion order.
+        """
+        self.open_DB()
+        seqs, data, weights = self.__read_since(id, 0)
+
+        self.close_DB()
+        return data
+    
+    def get_user_weighted_data_since(self, id, watermark):
+        """
+        Retrieve the x, y, and v values and the weights of the dots a user inserted after a watermark.
+
+        Args:
+        - id (int): The id of the user to retrieve data for.
+        - watermark (int): The motion rowid to start after.
+
+        Returns:
+        - tuple: A NumPy array containing the x, y, and v values, a NumPy array containing the weight of every dot,
+                 and the rowid of the last returned dot (the watermark itself if there are no new dots).
+        """
+        self.open_DB()
+        seqs, data, weights = self.__read_since(id, watermark)
+
+        self.close_DB()
+        last = max(watermark, int(seqs.max())) if len(seqs) > 0 else watermark
+        return data, weights, last
+
+    # Private method to read the dots of a user after a watermark (both layouts) with the open connection.
+    # Returns the sequence number, the x, y, and v values and the weight of every dot, in insertion order
+    # (a user may have dots in both layouts, after MOTION_STORAGE changed or compact_user rewrote old rows).
+    def __read_since(self, id, watermark):
+        rows = self.__execute('get_user_data_since', (id, watermark)).fetchall()
+        chunks = self.__execute('get_user_chunks_since', (id, watermark)).fetchall()
+
+        # a chunk holds the sequence numbers up to its seq
+        seqs = [np.array([row[0] for row in rows], dtype=np.int64)]
+        weights = [np.array([row[4] for row in rows], dtype=float)]
+        for seq, chunk, chunk_weights in chunks:
+            count = len(chunk) // 12
+            seqs.append(np.arange(seq - count + 1, seq + 1, dtype=np.int64))
+            weights.append(SQLiteEngine.__unpack_weights(chunk_weights, count))
+        data = SQLiteEngine.__combine([row[1:4] for row in rows], [SQLiteEngine.__unpack_chunk(chunk) for seq, chunk, w in chunks])
+        seqs = np.concatenate(seqs)
+        order = np.argsort(seqs, kind='stable')
+        return seqs[order], data[order], np.concatenate(weights)[order]
+
+    def iter_user_data(self, id, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Streams the x, y, and v values of a user (both layouts) in fixed-size chunks, in insertion order,
+        without ever holding the whole dataset in memory.
+
+        Args:
+        - id (int): The id of the user to retrieve data for.
+        - chunk_size (int): The number of dots in every chunk (the last one may be shorter).
+
+        Yields:
+        - numpy.ndarray: A (chunk_size, 3) array of x, y, and v values. The array is a reused buffer,
+                         it is only valid until the next chunk is requested.
+        """
+        return self.__iter_data(('stream_user_data', 'stream_user_chunks'), (id,), chunk_size)
+
+    def iter_others_data(self, id, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Streams the x, y, and v values of all the users except one (both layouts) in fixed-size chunks.
+
+        Args:
+        - id (int): The id of the user to exclude.
+        - chunk_size (int): The number of dots in every chunk (the last one may be shorter).
+
+        Yields:
+        - numpy.ndarray: A (chunk_size, 3) array of x, y, and v values. The array is a reused buffer,
+                         it is only valid until the next chunk is requested.
+        """
+        return self.__iter_data(('stream_others_data', 'stream_others_chunks'), (id,), chunk_size)
+
+    # Private generator behind iter_user_data and iter_others_data.
+    # The rows (fetched with fetchmany) and the chunk blobs are merged by sequence number, so the dots come in
+    # insertion order, and copied into one preallocated buffer. The generator keeps its own cursors, so the
+    # engine can be used meanwhile.
+    def __iter_data(self, statements: tuple, params: tuple, chunk_size: int):
+        self.open_DB()
+        conn, cursor = self.conn, self.cursor
+        chunks_cursor = conn.cursor()
+        try:
+            buffer = np.empty((chunk_size, 3))
+            filled = 0
+
+            for piece in SQLiteEngine.__merge_layouts(cursor.execute(STATEMENTS[statements[0]], params),
+                                                      chunks_cursor.execute(STATEMENTS[statements[1]], params),
+                                                      chunk_size):
+                while len(piece) > 0:
+                    taken = min(chunk_size - filled, len(piece))
+                    buffer[filled:filled + taken] = piece[:taken]
+                    filled += taken
+                    piece = piece[taken:]
+                    if filled == chunk_size:
+                        yield buffer
+                        filled = 0
+
+            if filled > 0:
+                yield buffer[:filled]
+        finally:
+            chunks_cursor.close()
+            self.__release(conn, cursor)
+
+    # Private generator to merge (rowid, x, y, v) rows and (seq, blob) chunks, both sorted, by sequence number.
+    # Yields (count, 3) arrays of x, y, and v values. A chunk holds the sequence numbers up to its seq and no
+    # row falls inside a chunk, so a chunk comes before the rows whose rowid is above its seq.
+    @staticmethod
+    def __merge_layouts(rows_cursor, chunks_cursor, rows_at_once: int):
+        chunk = chunks_cursor.fetchone()
+        while True:
+            rows = rows_cursor.fetchmany(rows_at_once)
+            if rows == []:
+                break
+            rows = np.array(rows, dtype=float)
+            while len(rows) > 0:
+                if chunk is not None and chunk[0] < rows[0, 0]:
+                    yield SQLiteEngine.__unpack_chunk(chunk[1])
+                    chunk = chunks_cursor.fetchone()
+                    continue
+                end = len(rows) if chunk is None else int(np.searchsorted(rows[:, 0], chunk[0]))
+                yield rows[:end, 1:]
+                rows = rows[end:]
+        while chunk is not None:
+            yield SQLiteEngine.__unpack_chunk(chunk[1])
+            chunk = chunks_cursor.fetchone()
+
+    @staticmethod
+    def __unpack_chunk(chunk: bytes) -> np.ndarray:
+        """
+        Views a motion_chunks blob as a (count, 3) float32 array, without copying it.
+
+        Args:
+        - chunk (bytes): The blob.
+
+        Returns:
+        - numpy.ndarray: The x, y, and v values of the chunk's dots.
+        """
+        return np.frombuffer(chunk, dtype='<f4').reshape(-1, 3)
+
+    @staticmethod
+    def __unpack_weights(weights, count: int) -> np.ndarray:
+        """
+        Reads the weights blob of a motion_chunks row.
+
+        Args:
+        - weights (bytes): The blob, None if every dot of the chunk weighs 1.
+        - count (int): The number of dots in the chunk.
+
+        Returns:
+        - numpy.ndarray: The weight of every dot of the chunk.
+        """
+        if weights is None:
+            return np.ones(count)
+        return np.frombuffer(weights, dtype='<f4').astype(float)
+
+    @staticmethod
+    def __pack_weights(weights: np.ndarray):
+        """
+        Packs the weights of a chunk into a blob.
+
+        Args:
+        - weights (np.ndarray): The weight of every dot of the chunk.
+
+        Returns:
+        - sqlite3.Binary: The float32 values, or None if every dot weighs 1.
+        """
+        if np.all(weights == 1):
+            return None
+        return sqlite3.Binary(np.ascontiguousarray(weights, dtype='<f4').tobytes())
+
+    @staticmethod
+    def __combine(rows: list, chunks: list) -> np.ndarray:
+        """
+        Combines dots read from both layouts into one array.
+
+        Args:
+        - rows (list): (x, y, v) tuples read from the motion table.
+        - chunks (list): (count, 3) arrays read from the motion_chunks table.
+
+        Returns:
+        - numpy.ndarray: A NumPy array containing the x, y, and v values of all the dots.
+        """
+        if rows != []:
+            chunks = [np.array(rows)] + chunks
+        if chunks == []:
+            return np.empty((0, 3))
+        if len(chunks) == 1:
+            return chunks[0]
+        return np.concatenate(chunks)
+
+    def delete_user(self, username) -> bool:
+        """
+        Delete a user and associated data from the database.
+
+        Args:
+        - username (str): The username of the user to delete.
+
+        Returns:
+        - bool: True if the user was deleted successfully, False otherwise.
+        """
+        exist = self.get_user_password(username)
+        if not exist: 
+            return False
+        
+        self.open_DB()
+        id = self.__get_id(username)
+
+        #delete from users
+        res = self.__execute('delete_user', (id,))
+        self.commit()
+
+        #delete from motion
+        res = self.__execute('delete_dots', (id,))
+        res = self.__execute('delete_chunks', (id,))
+        self.commit()
+
+        #delete from network
+        res = self.__execute('delete_neural_network', (id,))
+        self.commit()
+
+        #delete the training state
+        res = self.__execute('delete_training_state', (id,))
+        self.commit()
+
+        #delete the statistics
+        res = self.__execute('delete_stats', (id,))
+        self.commit()
+
+        #delete from the cross-user sample, the emptied slots are filled by the next ingested dots
+        res = self.__execute('free_sample_slots', (id,))
+        res = self.__execute('delete_sample', (id,))
+        self.commit()
+
+        self.close_DB()
+        return True
+    
+
+    def get_users_list(self):
+        """
+        Retrieve a list of all usernames in the "users" table.
+
+        Returns:
+        - list: A list of all usernames in the "users" table.
+        """
+        self.open_DB()
+
+        res = self.__execute('get_users_list')
+        users = res.fetchall()
+
+        self.close_DB()
+        return [user[0] for user in users]
+
+    def get_others_data(self, id):
+        """
+        Retrieves the x, y, and v data for all the dots (of both layouts) that have an id
+        value different from the given id parameter.
+        
+        Args:
+        id (int): The ID value to exclude from the query.
+        
+        Returns:
+        numpy.ndarray: A numpy array containing the x, y, and v data for the selected rows.
+        """
+        self.open_DB()
+
+        res = self.__execute('get_others_data', (id,))
+        rows = res.fetchall()
+        res = self.__execute('get_others_chunks', (id,))
+        chunks = [SQLiteEngine.__unpack_chunk(chunk) for chunk, in res]
+
+        self.close_DB()
+        return SQLiteEngine.__combine(rows, chunks)
+
+
+    def get_others_sample(self, id):
+        """
+        Retrieves the x, y, and v data of the dots of the other users that are in the cross-user sample
+        (a fixed-size uniform sample of all the dots, kept up to date at ingest), instead of scanning all of them.
+
+        The sample is only approximately uniform: the slots of deleted users are refilled by the next ingested
+        dots, which favours the newer dots a little, and dots removed by compact_user stay in the sample (they
+        still are real movements of their user).
+
+        Args:
+        id (int): The ID value to exclude from the sample.
+
+        Returns:
+        numpy.ndarray: A numpy array containing the x, y, and v data of the sampled dots.
+        """
+        self.open_DB()
+
+        res = self.__execute('get_others_sample', (id,))
+        rows = res.fetchall()
+
+        self.close_DB()
+        return SQLiteEngine.__combine(rows, [])
+
+    def insert_dots_groups(self, groups: list) -> bool:
+        """
+        Inserts batches of dots of several users (see MOTION_STORAGE), all in a single transaction
+        (a group commit).
+
+        Args:
+        groups (list): (id, dots) pairs or (id, dots, weights) triples, dots being a 2D array of shape (N, 3)
+                       holding the x, y, and v values of every new row of the user and weights the weight of
+                       every row (None for a weight of 1).
+
+        Returns:
+        bool: True if the insertion was successful, False otherwise.
+        """
+        groups = StorageEngine.normalize_groups(groups)
+        if groups == []:
+            return True
+
+        self.open_DB()
+
+        try:
+            # the write lock is taken before the sequence and the reservoir state are read (sqlite3 would only
+            # begin the transaction at the first write), so no other writer can read the same values
+            self.__execute('begin_immediate')
+            for id, dots, weights in groups:
+                self.__insert_dots(id, dots, weights)
+            self.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        finally:
+            self.close_DB()
+
+        return True
+
+    def __insert_dots(self, id, dots, weights):
+        """
+        Inserts dots of a user in the layout set by MOTION_STORAGE (a row per dot, or one chunk for the whole
+        batch) and updates the user's statistics, in the current transaction, which must hold the write lock.
+
+        Args:
+        id (int): The ID value for the new rows.
+        dots (np.ndarray): A 2D array of shape (N, 3) holding the x, y, and v values of every new row.
+        weights (np.ndarray): The weight of every new row.
+        """
+        # both layouts take their sequence numbers from one sequence, so rows and chunks never overlap.
+        # The transaction holds the write lock (see insert_dots_groups), so the sequence can not move under us
+        first_rowid = self.__execute('last_seq').fetchone()[0] + 1
+        last_rowid = first_rowid + len(dots) - 1
+        if MOTION_STORAGE == 'chunks':
+            chunk = np.ascontiguousarray(dots, dtype='<f4')
+            self.__execute('insert_chunk', (last_rowid, id, len(dots), sqlite3.Binary(chunk.tobytes()),
+                                            SQLiteEngine.__pack_weights(weights)))
+            dots = chunk.astype(float)  # the statistics describe the stored values
+        else:
+            self.__executemany('insert_dot', ((rowid, id, x, y, v, w) for rowid, (x, y, v), w
+                                              in zip(range(first_rowid, last_rowid + 1), dots.tolist(), weights.tolist())))
+        self.__update_stats(id, dots[:, 0], dots[:, 1], dots[:, 2], last_rowid)
+        self.__sample_dots(id, dots)
+
+    def __sample_dots(self, id, dots):
+        """
+        Passes inserted dots through the cross-user reservoir sample (see reservoir.py), in the current transaction.
+
+        Args:
+        id (int): The ID of the user the dots belong to.
+        dots (np.ndarray): A 2D array of shape (N, 3) holding the x, y, and v values of the dots.
+        """
+        seen, size = self.__execute('get_reservoir_state').fetchone()
+
+        # the slots emptied by deleted users are filled first, the rest of the dots are sampled as usual
+        # (the dots that fill them are not counted as seen, so the first 'size' positions stay contiguous)
+        free = [slot for slot, in self.__execute('get_free_slots', (len(dots),)).fetchall()]
+        self.__executemany('set_reservoir_slot',
+                           ((slot, id, x, y, v) for slot, (x, y, v) in zip(free, dots[:len(free)].tolist())))
+        self.__executemany('take_free_slot', ((slot,) for slot in free))
+
+        rest = dots[len(free):]
+        slots, indices = reservoir_slots(seen, len(rest), size)
+        self.__executemany('set_reservoir_slot',
+                           ((slot, id, x, y, v) for slot, (x, y, v) in zip(slots.tolist(), rest[indices].tolist())))
+        self.__execute('set_reservoir_seen', (seen + len(rest),))
+
+    def compact_user(self, id: int, until: int, keep: int) -> int:
+        """
+        Downsamples the dots of a user up to a watermark to 'keep' dots, in a single transaction.
+        The kept dots are spread evenly over the period (a stratified sample, so the older and the newer
+        habits of the user keep their share) and rewritten as chunks of RETENTION_CHUNK_DOTS dots, which also
+        compacts dots stored as rows. The dots after the watermark are not touched.
+
+        Args:
+        id (int): The ID of the user.
+        until (int): The watermark, the rowid of the last dot that may be removed. It must be the end of a
+                     chunk, like the training watermarks.
+        keep (int): The number of dots up to the watermark to keep.
+
+        Returns:
+        int: The number of dots removed.
+        """
+        self.open_DB()
+
+        try:
+            # the write lock is taken before reading, so no dot of the user is inserted meanwhile
+            self.__execute('begin_immediate')
+            seqs, dots, weights = self.__read_since(id, 0)
+
+            old = np.flatnonzero(seqs <= until)
+            if len(old) <= keep:
+                self.conn.rollback()
+                return 0
+            kept = old[stratified_indices(len(old), keep)]
+
+            self.__execute('delete_dots_until', (id, until))
+            self.__execute('delete_chunks_until', (id, until))
+            for start in range(0, len(kept), RETENTION_CHUNK_DOTS):
+                chunk = kept[start:start + RETENTION_CHUNK_DOTS]
+                blob = np.ascontiguousarray(dots[chunk], dtype='<f4').tobytes()
+                self.__execute('insert_chunk', (int(seqs[chunk[-1]]), id, len(chunk), sqlite3.Binary(blob),
+                                                SQLiteEngine.__pack_weights(weights[chunk])))
+
+            # the statistics are rebuilt from what is left, the last rowid does not change
+            remaining = np.concatenate((dots[kept].astype('<f4').astype(float), dots[seqs > until]))
+            if len(remaining) == 0:
+                # nothing is left, like a user who never had dots
+                self.__execute('delete_stats', (id,))
+            else:
+                values = [id, len(remaining)]
+                for column in remaining.T:
+                    values += [float(column.min()), float(column.max()), float(column.sum())]
+                values.append(int(seqs[-1]))
+                self.__execute('set_stats', values)
+
+            self.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        finally:
+            self.close_DB()
+
+        return len(old) - len(kept)
+
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Switches the database to incremental auto-vacuum mode, if it is not in it yet. The switch takes one
+        full VACUUM, which locks the whole database while the file is rewritten, so it is done once at startup
+        (MainServer.activate), before anything else writes to the database.
+
+        Returns:
+        bool: True if the database was switched now, False if it already was in that mode.
+        """
+        self.open_DB()
+
+        switched = self.__execute('get_auto_vacuum').fetchone()[0] != 2
+        if switched:
+            print('Switching the database to incremental auto-vacuum, this rewrites the database file once')
+            self.__execute('set_incremental_auto_vacuum')
+            self.__execute('vacuum')
+
+        self.close_DB()
+        return switched
+
+    def incremental_vacuum(self) -> int:
+        """
+        Releases up to RETENTION_VACUUM_PAGES free pages of the database file to the file system.
+        Nothing is released until the database is in incremental auto-vacuum mode (see enable_incremental_vacuum).
+
+        Returns:
+        int: The number of free pages left in the database file.
+        """
+        self.open_DB()
+
+        self.__execute('incremental_vacuum').fetchall()
+        free_pages = self.__execute('get_freelist_count').fetchone()[0]
+
+        self.close_DB()
+        return free_pages
@@ -0,0 +1,91 @@
+from .variables.constants import RETENTION_VACUUM_PAGES
+
+# The SQL statements of DotORM, by name.
+# Every value is bound as a parameter, so the text of a statement never changes: sqlite3 parses and plans
+# it once per connection and serves it from the connection's statement cache afterwards.
+
+STATEMENTS = {
+    # users
+    'get_email': "SELECT email FROM users WHERE id = ?;",
+    'get_user_password': "SELECT password FROM users WHERE username = ?;",
+    'get_id': "SELECT id FROM users WHERE username = ?;",
+    'get_all_id': "SELECT id FROM users;",
+    'get_users_list': "SELECT username FROM users;",
+    'insert_user': "INSERT INTO users (username, password, email) VALUES (?, ?, ?);",
+    'delete_user': "DELETE FROM users WHERE id = ?;",
+
+    # network
+    'get_neural_network': "SELECT network FROM network WHERE id = ?;",
+    'has_neural_network': "SELECT 1 FROM network WHERE id = ?;",
+    'dump_neural_network': """
+        INSERT INTO network (id, network)
+        VALUES (?, ?)
+        ON CONFLICT(id) DO UPDATE SET network = excluded.network;
+    """,
+    'delete_neural_network': "DELETE FROM network WHERE id = ?;",
+
+    # motion
+    'insert_dot': "INSERT INTO motion (rowid, id, x, y, v, w) VALUES (?, ?, ?, ?, ?, ?);",
+    'stream_user_data': "SELECT rowid,x,y,v FROM motion WHERE id = ? ORDER BY rowid;",
+    'get_user_data_since': "SELECT rowid,x,y,v,w FROM motion WHERE id = ? AND rowid > ? ORDER BY rowid;",
+    'count_dots_since': "SELECT COUNT(*) FROM motion WHERE id = ? AND rowid > ?;",
+    'get_others_data': "SELECT x,y,v FROM motion WHERE id != ?;",
+    'stream_others_data': "SELECT rowid,x,y,v FROM motion WHERE id != ? ORDER BY rowid;",
+    'delete_dots': "DELETE FROM motion WHERE id = ?;",
+
+    # motion_chunks
+    'insert_chunk': "INSERT INTO motion_chunks (seq, id, count, dots, weights) VALUES (?, ?, ?, ?, ?);",
+    'last_seq': """
+        SELECT MAX(COALESCE((SELECT MAX(rowid) FROM motion), 0), COALESCE((SELECT MAX(seq) FROM motion_chunks), 0));
+    """,
+    'stream_user_chunks': "SELECT seq, dots FROM motion_chunks WHERE id = ? ORDER BY seq;",
+    'get_user_chunks_since': "SELECT seq, dots, weights FROM motion_chunks WHERE id = ? AND seq > ? ORDER BY seq;",
+    'count_chunk_dots_since': "SELECT COALESCE(SUM(count), 0) FROM motion_chunks WHERE id = ? AND seq > ?;",
+    'get_others_chunks': "SELECT dots FROM motion_chunks WHERE id != ?;",
+    'stream_others_chunks': "SELECT seq, dots FROM motion_chunks WHERE id != ? ORDER BY seq;",
+    'delete_chunks': "DELETE FROM motion_chunks WHERE id = ?;",
+    'delete_dots_until': "DELETE FROM motion WHERE id = ? AND rowid <= ?;",
+    'delete_chunks_until': "DELETE FROM motion_chunks WHERE id = ? AND seq <= ?;",
+
+    # reservoir
+    'get_reservoir_state': "SELECT seen, size FROM reservoir_state WHERE key = 0;",
+    'set_reservoir_seen': "UPDATE reservoir_state SET seen = ? WHERE key = 0;",
+    'set_reservoir_slot': "INSERT OR REPLACE INTO reservoir (slot, id, x, y, v) VALUES (?, ?, ?, ?, ?);",
+    'get_others_sample': "SELECT x,y,v FROM reservoir WHERE id != ?;",
+    'delete_sample': "DELETE FROM reservoir WHERE id = ?;",
+    'free_sample_slots': "INSERT OR IGNORE INTO reservoir_free (slot) SELECT slot FROM reservoir WHERE id = ?;",
+    'get_free_slots': "SELECT slot FROM reservoir_free ORDER BY slot LIMIT ?;",
+    'take_free_slot': "DELETE FROM reservoir_free WHERE slot = ?;",
+
+    # user_stats
+    'get_user_stats': "SELECT * FROM user_stats WHERE id = ?;",
+    'update_stats': """
+        INSERT INTO user_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            count = count + excluded.count,
+            min_x = MIN(min_x, excluded.min_x), max_x = MAX(max_x, excluded.max_x), sum_x = sum_x + excluded.sum_x,
+            min_y = MIN(min_y, excluded.min_y), max_y = MAX(max_y, excluded.max_y), sum_y = sum_y + excluded.sum_y,
+            min_v = MIN(min_v, excluded.min_v), max_v = MAX(max_v, excluded.max_v), sum_v = sum_v + excluded.sum_v,
+            last_rowid = MAX(last_rowid, excluded.last_rowid);
+    """,
+    'set_stats': "INSERT OR REPLACE INTO user_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);",
+    'delete_stats': "DELETE FROM user_stats WHERE id = ?;",
+
+    # maintenance
+    'begin_immediate': "BEGIN IMMEDIATE;",
+    'get_auto_vacuum': "PRAGMA auto_vacuum;",
+    'set_incremental_auto_vacuum': "PRAGMA auto_vacuum = INCREMENTAL;",
+    'vacuum': "VACUUM;",
+    # pragma arguments can not be bound, the page count is fixed by the constant
+    'incremental_vacuum': f"PRAGMA incremental_vacuum({RETENTION_VACUUM_PAGES});",
+    'get_freelist_count': "PRAGMA freelist_count;",
+
+    # training_state
+    'get_training_watermark': "SELECT watermark FROM training_state WHERE id = ?;",
+    'set_training_watermark': """
+        INSERT INTO training_state (id, watermark)
+        VALUES (?, ?)
+        ON CONFLICT(id) DO UPDATE SET watermark = excluded.watermark;
+    """,
+    'delete_training_state': "DELETE FROM training_state WHERE id = ?;",
+}
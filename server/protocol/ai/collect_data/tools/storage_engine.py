@@ -0,0 +1,256 @@
+import numpy as np
+from .basic_classes.dot import Dot
+from .basic_classes.user import User
+from .variables.constants import STREAM_CHUNK_SIZE
+
+# The interface of the storage engines behind DotORM.
+# An engine keeps the users, their dots (each with a sequence number and a weight), their networks, their
+# training watermarks, running statistics and the cross-user reservoir sample. One engine instance serves
+# every thread of the process, so the engines keep no per-call state on the instance.
+
+
+def stratified_indices(count: int, keep: int) -> np.ndarray:
+    """
+    Picks 'keep' indices spread evenly over range(count), the sample kept when a user is compacted.
+
+    Args:
+        count (int): The number of items.
+        keep (int): The number of items to keep.
+
+    Returns:
+        np.ndarray: The kept indices, in increasing order.
+    """
+    if keep <= 0:
+        return np.empty(0, dtype=np.int64)
+    return np.linspace(0, count - 1, keep).round().astype(np.int64)
+
+
+class StorageEngine:
+    """
+    The base class of the storage engines (see SQLiteEngine and MemoryEngine).
+
+    The engines override the methods that raise 'Override required!' here. The other methods are
+    built on top of them and may be overridden when an engine can do better.
+
+    Methods:
+    - open_pool(self), close_pool(self)
+      Start and end the server's use of the engine (connection pools and the like), nothing by default.
+
+    users:
+    - insert_user(self, u: User) -> bool
+    - get_id(self, username) -> int
+    - get_all_id(self) -> list
+    - get_users_list(self) -> list
+    - get_user_password(self, username)
+    - get_email(self, id: int)
+    - delete_user(self, username) -> bool
+
+    networks and training:
+    - dump_neural_network(self, id: int, network) -> bool
+    - get_neural_network(self, id: int)
+    - has_neural_network(self, id: int) -> bool
+    - get_training_watermark(self, id: int) -> int
+    - set_training_watermark(self, id: int, watermark: int) -> bool
+
+    dots:
+    - insert_dots_groups(self, groups: list) -> bool
+    - get_user_stats(self, id: int)
+    - count_dots_since(self, id: int, watermark: int) -> int
+    - get_user_data(self, id)
+    - get_user_weighted_data_since(self, id, watermark) -> tuple
+    - iter_user_data(self, id, chunk_size), iter_others_data(self, id, chunk_size)
+    - get_others_data(self, id), get_others_sample(self, id)
+    - compact_user(self, id: int, until: int, keep: int) -> int
+    - incremental_vacuum(self) -> int (after enable_incremental_vacuum(self) at startup)
+    """
+
+    def open_pool(self):
+        """
+        Prepares the engine for the many threads of the server.
+        """
+
+    def close_pool(self):
+        """
+        Releases what open_pool prepared.
+        """
+
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Prepares the engine for incremental_vacuum, once at startup. Nothing to prepare by default.
+
+        Returns:
+        bool: True if anything was changed.
+        """
+        return False
+
+    def is_admin(self, id):
+        """
+        return if user is admin (id=0)
+        """
+        return id == 0
+
+    def count_dots(self, id: int) -> int:
+        """
+        Counts the number of Dot objects associated with a user ID.
+
+        Args:
+        id (int): The ID of the user.
+
+        Returns:
+        int: The number of Dot objects associated with the user ID (0 if the
+             user ID is not found), read from the user's running statistics.
+        """
+        stats = self.get_user_stats(id)
+        return stats['count'] if stats else 0
+
+    def get_last_dot_rowid(self, id: int) -> int:
+        """
+        Retrieves the rowid of the last dot inserted for a user.
+
+        Args:
+        id (int): The ID of the user.
+
+        Returns:
+        int: The rowid, or 0 if the user has no dots.
+        """
+        stats = self.get_user_stats(id)
+        return stats['last_rowid'] if stats else 0
+
+    def get_max_v(self, id: int):
+        """
+        Retrieves the maximum value of the 'v' field of a user's dots.
+
+        Args:
+            - id: the id of the user.
+
+        Returns:
+            - v: the maximum value of the 'v' field (None if the user has no dots),
+                 read from the user's running statistics.
+        """
+        stats = self.get_user_stats(id)
+        return stats['max_v'] if stats else None
+
+    def insert_dot(self, username, d: Dot):
+        """
+        Inserts a new dot for the user with the given username.
+
+        Args:
+        username (str): The username associated with the new dot.
+        dot (Dot): A Dot object containing the x, y, and v values (and the weight) of the new dot.
+
+        Returns:
+        bool: True if the insertion was successful, False otherwise.
+        """
+        return self.insert_dot_by_id(self.get_id(username), d)
+
+    def insert_dot_by_id(self, id, d: Dot):
+        """
+        Inserts a new dot for the user with the given id.
+
+        Args:
+        id (int): The ID value for the new dot.
+        dot (Dot): A Dot object containing the x, y, and v values (and the weight) of the new dot.
+
+        Returns:
+        bool: True if the insertion was successful, False otherwise.
+        """
+        return self.insert_dots_bulk(id, np.array([[d.x, d.y, d.v]], dtype=float), np.array([d.w], dtype=float))
+
+    def insert_dots_bulk(self, id, dots, weights=None) -> bool:
+        """
+        Inserts a batch of dots with the given id, at once.
+
+        Args:
+        id (int): The ID value for the new dots.
+        dots (np.ndarray): A 2D array of shape (N, 3) holding the x, y, and v values of every new dot.
+        weights (np.ndarray): The weight of every new dot, None for a weight of 1.
+
+        Returns:
+        bool: True if the insertion was successful, False otherwise.
+        """
+        return self.insert_dots_groups([(id, dots, weights)])
+
+    @staticmethod
+    def normalize_groups(groups: list) -> list:
+        """
+        Brings the groups given to insert_dots_groups to one form and drops the empty ones.
+
+        Args:
+        groups (list): (id, dots) pairs or (id, dots, weights) triples.
+
+        Returns:
+        list: (id, dots, weights) triples, dots being an (N, 3) float array and weights an (N,) float array.
+        """
+        groups = [(group[0], np.asarray(group[1], dtype=float).reshape(-1, 3), group[2] if len(group) > 2 else None)
+                  for group in groups]
+        return [(id, dots, np.ones(len(dots)) if weights is None else np.asarray(weights, dtype=float))
+                for id, dots, weights in groups if len(dots) > 0]
+
+    def insert_user(self, u: User):
+        raise Exception('Override required!')
+
+    def get_id(self, username):
+        raise Exception('Override required!')
+
+    def get_all_id(self):
+        raise Exception('Override required!')
+
+    def get_users_list(self):
+        raise Exception('Override required!')
+
+    def get_user_password(self, username):
+        raise Exception('Override required!')
+
+    def get_email(self, id: int) -> str:
+        raise Exception('Override required!')
+
+    def delete_user(self, username) -> bool:
+        raise Exception('Override required!')
+
+    def dump_neural_network(self, id: int, network):
+        raise Exception('Override required!')
+
+    def get_neural_network(self, id: int):
+        raise Exception('Override required!')
+
+    def has_neural_network(self, id: int) -> bool:
+        raise Exception('Override required!')
+
+    def get_training_watermark(self, id: int) -> int:
+        raise Exception('Override required!')
+
+    def set_training_watermark(self, id: int, watermark: int) -> bool:
+        raise Exception('Override required!')
+
+    def insert_dots_groups(self, groups: list) -> bool:
+        raise Exception('Override required!')
+
+    def get_user_stats(self, id: int):
+        raise Exception('Override required!')
+
+    def count_dots_since(self, id: int, watermark: int) -> int:
+        raise Exception('Override required!')
+
+    def get_user_data(self, id):
+        raise Exception('Override required!')
+
+    def get_user_weighted_data_since(self, id, watermark):
+        raise Exception('Override required!')
+
+    def iter_user_data(self, id, chunk_size=STREAM_CHUNK_SIZE):
+        raise Exception('Override required!')
+
+    def iter_others_data(self, id, chunk_size=STREAM_CHUNK_SIZE):
+        raise Exception('Override required!')
+
+    def get_others_data(self, id):
+        raise Exception('Override required!')
+
+    def get_others_sample(self, id):
+        raise Exception('Override required!')
+
+    def compact_user(self, id: int, until: int, keep: int) -> int:
+        raise Exception('Override required!')
+
+    def incremental_vacuum(self) -> int:
+        raise Exception('Override required!')
@@ -22,3 +22,88 @@ TOKEN_VALIDATION_TIME = 1*60*60 # 1 hour
 
 # Minimum number of dots required to test a user
 MIN_DOTS_TO_TEST_USER = 100
+
+# Number of samples propagated together in every training step
+BATCH_SIZE = 64
+
+# Floating point type used by the neural network and the normalized data
+DTYPE = 'float32'
+
+# Optimizer used to update the weights during training ('sgd', 'momentum', 'rmsprop', 'adam')
+OPTIMIZER = 'adam'
+
+# Maximum number of epochs a single training may run
+MAX_TRAINING_EPOCHS = 1000
+# Maximum wall-clock time of a single training
+MAX_TRAINING_TIME = 4*60*60 # 4 hours
+# Number of epochs without improvement after which the cost is considered on a plateau
+TRAINING_PATIENCE = 20
+# What to do on a plateau: 'stop' training or 'reduce_lr' (reduce the learning rate, stop once it is too small)
+PLATEAU_ACTION = 'reduce_lr'
+
+# Save a training checkpoint every this many epochs
+CHECKPOINT_EVERY_EPOCHS = 10
+# Save a training checkpoint at least every this many seconds
+CHECKPOINT_EVERY_SECONDS = 10*60 # 10 minutes
+# Number of checkpoint files kept per trained network
+CHECKPOINT_KEEP_LAST = 3
+
+# Number of worker processes the networks are trained in (None for one per CPU core)
+TRAINING_WORKERS = None
+
+# Cost at which the training of a user's network stops
+TRAINING_COST_TO_STOP = 0.0015
+# Maximum number of trainings running at once (None for one per training worker)
+MAX_CONCURRENT_TRAININGS = None
+
+# Minimum number of new dots since the last training for a network to be retrained
+RETRAIN_MIN_NEW_DOTS = 25000
+# Maximum number of epochs of an incremental retraining
+RETRAIN_MAX_EPOCHS = 50
+# Learning rate of an incremental retraining (a fine-tune of the existing network)
+RETRAIN_LEARNING_RATE = 0.0001
+
+# SQLite page cache of every pooled database connection, in KiB
+DB_CACHE_SIZE_KB = 64*1024 # 64 MiB
+# Size of the memory-mapped part of the database file of every pooled connection, in bytes
+DB_MMAP_SIZE = 256*1024*1024 # 256 MiB
+
+# Maximum number of DATABL batches waiting for the ingest writer (collectors block when it is full)
+INGEST_QUEUE_SIZE = 1000
+# The ingest writer commits once this many dots are pending...
+INGEST_MAX_BATCH_DOTS = 5000
+# ...or once the oldest pending dot waited this many seconds
+INGEST_MAX_DELAY = 0.5
+# Seconds between two reports of the ingest writer's statistics
+INGEST_REPORT_INTERVAL = 60
+# Number of times a failed commit of the ingest writer is retried (then every user's batch is written on its own)
+INGEST_COMMIT_RETRIES = 3
+# Seconds before the first retry of a failed commit, doubled for every further retry
+INGEST_RETRY_DELAY = 0.5
+
+# Seconds a database connection waits for a lock held by another connection before failing
+DB_BUSY_TIMEOUT = 30
+# Number of prepared statements every database connection keeps cached
+DB_STATEMENT_CACHE_SIZE = 128
+
+# How new dots are stored: 'chunks' (a packed float32 blob per ingested batch, in motion_chunks)
+# or 'rows' (a row per dot, in motion). Both layouts are always read, switching from rows to chunks is one-way
+MOTION_STORAGE = 'chunks'
+
+# Number of dots in every chunk streamed from the database (DotORM.iter_user_data)
+STREAM_CHUNK_SIZE = 10000
+
+# Number of dots in the cross-user sample (reservoir) the other users' data is read from.
+# Only used when the reservoir is created, the size is kept in the database after that
+RESERVOIR_SIZE = 100000
+
+# A user with more dots than this is downsampled by the retention policy...
+RETENTION_MAX_DOTS = 4 * MIN_DATA_AMOUNT
+# ...to this many dots (dots that were not trained on yet are always kept)
+RETENTION_TARGET_DOTS = 2 * MIN_DATA_AMOUNT
+# Number of dots in every chunk the downsampled dots are rewritten in
+RETENTION_CHUNK_DOTS = 10000
+# Seconds between two runs of the retention policy
+RETENTION_INTERVAL = 60*60 # 1 hour
+# Number of free database pages released to the file system by every run
+RETENTION_VACUUM_PAGES = 10000
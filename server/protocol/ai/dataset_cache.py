@@ -0,0 +1,246 @@
+import io
+import json
+import os
+import threading
+import numpy as np
+from .collect_data.tools.SQL_ORM import DotORM
+from .collect_data.tools.data_utils import DataUtils
+from .collect_data.tools.variables.constants import V_MIN
+
+# Directory the cached datasets are kept in
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'collect_data', 'tools', 'data', 'datasets')
+
+
+class DatasetCache:
+    """
+    An on-disk cache of the users' normalized training datasets.
+
+    Every user's dots are kept normalized, as a float32 (N, 4) array in 'user_{id}.npy' (x, y, v and the
+    weight of the dot, see DataUtils.dedup_dots), next to a 'user_{id}.json' file holding the ingest watermark the array is up to date with, its number of rows and
+    the maximum speed it was normalized by. Bringing a cache up to date only reads the dots inserted after
+    its watermark and appends them to the file in place. The file is rewritten (to a new file, so arrays
+    already mapped by other processes stay valid) only when the maximum speed grows or dots were deleted.
+
+    Trainings, evaluations and the training worker processes open the arrays with np.load(mmap_mode='r'),
+    so they all share the same pages instead of reading the database again.
+
+    Attributes:
+    - directory: The directory the datasets are kept in.
+    - db: A DotORM instance used to interact with a database.
+
+    Methods:
+    - update(self, id: int) -> dict
+      Brings the dataset of a user up to date with the database.
+
+    - load(self, id: int) -> np.ndarray
+      The up to date dataset of a user, memory-mapped.
+
+    - load_weighted(self, id: int) -> tuple
+      The up to date dataset of a user and the weights of its rows, memory-mapped.
+
+    - path(self, id: int) -> str
+      The path of the dataset file of a user.
+
+    - remove(self, id: int)
+      Deletes the cached dataset of a user.
+    """
+    # one lock per user, so two threads never update the same dataset at once
+    locks = {}
+    locks_lock = threading.Lock()
+
+    def __init__(self, directory: str = DATASETS_DIR) -> None:
+        self.directory = directory
+        self.db = DotORM()
+
+    def path(self, id: int) -> str:
+        """
+        The path of the dataset file of a user.
+
+        Args:
+        - id: The ID of the user.
+
+        Returns:
+        - The path of the .npy file.
+        """
+        return os.path.join(self.directory, f'user_{id}.npy')
+
+    def load(self, id: int) -> np.ndarray:
+        """
+        Brings the dataset of a user up to date and opens it.
+
+        Args:
+        - id: The ID of the user.
+
+        Returns:
+        - A read-only memory-mapped float32 array of shape (N, 3) holding the normalized dots of the user.
+        """
+        return self.load_weighted(id)[0]
+
+    def load_weighted(self, id: int) -> tuple:
+        """
+        Brings the dataset of a user up to date and opens it, with the weights of its rows.
+
+        Args:
+        - id: The ID of the user.
+
+        Returns:
+        - A read-only memory-mapped float32 array of shape (N, 3) holding the normalized dots of the user,
+          and a read-only memory-mapped float32 array of length N holding their weights.
+        """
+        self.update(id)
+        return DatasetCache.split(np.load(self.path(id), mmap_mode='r'))
+
+    @staticmethod
+    def split(dataset: np.ndarray) -> tuple:
+        """
+        Splits the rows of a dataset file into the dots and their weights, without copying them.
+
+        Args:
+        - dataset: An (N, 4) array read from a dataset file.
+
+        Returns:
+        - The (N, 3) normalized dots and the N weights.
+        """
+        return dataset[:, :3], dataset[:, 3]
+
+    def update(self, id: int) -> dict:
+        """
+        Brings the dataset of a user up to date with the database.
+
+        Args:
+        - id: The ID of the user.
+
+        Returns:
+        - The metadata of the dataset: 'watermark' (the last dot it holds), 'count' (its number of rows)
+          and 'max_v' (the maximum speed it is normalized by).
+        """
+        with DatasetCache.__lock(id):
+            meta = self.__read_meta(id)
+            if meta is not None and meta.get('columns') != 4:
+                # written before the dots had weights
+                meta = None
+            if meta is not None:
+                # the dots up to the watermark never change, unless some of them were deleted
+                stats = self.db.get_user_stats(id)
+                count = stats['count'] if stats else 0
+                if count != meta['count'] + self.db.count_dots_since(id, meta['watermark']):
+                    meta = None
+
+            if meta is None:
+                return self.__rebuild(id)
+            return self.__append(id, meta)
+
+    def remove(self, id: int) -> None:
+        """
+        Deletes the cached dataset of a user.
+
+        Args:
+        - id: The ID of the user.
+        """
+        with DatasetCache.__lock(id):
+            for path in (self.path(id), self.__meta_path(id)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    @classmethod
+    def __lock(cls, id: int) -> threading.Lock:
+        with cls.locks_lock:
+            return cls.locks.setdefault(id, threading.Lock())
+
+    def __meta_path(self, id: int) -> str:
+        return os.path.join(self.directory, f'user_{id}.json')
+
+    def __read_meta(self, id: int):
+        if not os.path.exists(self.path(id)) or not os.path.exists(self.__meta_path(id)):
+            return None
+        with open(self.__meta_path(id)) as f:
+            return json.load(f)
+
+    def __write_meta(self, id: int, meta: dict) -> None:
+        tmp_path = self.__meta_path(id) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.__meta_path(id))
+
+    # Private method to write the whole dataset of a user from the database.
+    def __rebuild(self, id: int) -> dict:
+        raw_data, weights, watermark = self.db.get_user_weighted_data_since(id, 0)
+        max_v = float(raw_data[:, 2].max()) if len(raw_data) > 0 else 0.0
+        data = DatasetCache.__rows(raw_data, weights, max_v)
+
+        self.__write_array(id, data)
+        meta = {'watermark': watermark, 'count': len(data), 'max_v': max_v, 'columns': 4}
+        self.__write_meta(id, meta)
+        return meta
+
+    # Private method to add the dots inserted after the watermark to the dataset of a user.
+    # A faster dot changes the normalization of every row, so then the dataset is rescaled into a new file.
+    def __append(self, id: int, meta: dict) -> dict:
+        raw_data, weights, watermark = self.db.get_user_weighted_data_since(id, meta['watermark'])
+        if len(raw_data) == 0:
+            return meta
+
+        max_v = max(meta['max_v'], float(raw_data[:, 2].max()))
+        new_data = DatasetCache.__rows(raw_data, weights, max_v)
+        if max_v != meta['max_v']:
+            data = np.array(np.load(self.path(id), mmap_mode='r'))
+            if meta['max_v'] > V_MIN:
+                data[:, 2] *= (meta['max_v'] - V_MIN) / (max_v - V_MIN)
+            self.__write_array(id, np.concatenate((data, new_data)))
+        elif not self.__append_in_place(self.path(id), new_data):
+            data = np.load(self.path(id), mmap_mode='r')
+            self.__write_array(id, np.concatenate((data, new_data)))
+
+        meta = {'watermark': watermark, 'count': meta['count'] + len(new_data), 'max_v': max_v, 'columns': 4}
+        self.__write_meta(id, meta)
+        return meta
+
+    # Private method to build the rows of a dataset file: the normalized dots and their weights.
+    @staticmethod
+    def __rows(raw_data: np.ndarray, weights: np.ndarray, max_v: float) -> np.ndarray:
+        data = DataUtils.normalize_data(raw_data, max_v)
+        return np.column_stack((data, weights.astype(data.dtype)))
+
+    def __write_array(self, id: int, data: np.ndarray) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path(id) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(data))
+        os.replace(tmp_path, self.path(id))
+
+    @staticmethod
+    def __append_in_place(path: str, rows: np.ndarray) -> bool:
+        """
+        Appends rows to a .npy file and rewrites the shape in its header.
+
+        Args:
+        - path: The path of the .npy file.
+        - rows: The rows to append, of the file's dtype.
+
+        Returns:
+        - True if the rows were appended, False if the new header does not fit in place of the old one.
+        """
+        with open(path, 'r+b') as f:
+            version = np.lib.format.read_magic(f)
+            if version != (1, 0):
+                return False
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            offset = f.tell()
+
+            header = io.BytesIO()
+            np.lib.format.write_array_header_1_0(header, {
+                'descr': np.lib.format.dtype_to_descr(dtype),
+                'fortran_order': fortran_order,
+                'shape': (shape[0] + len(rows),) + shape[1:],
+            })
+            if len(header.getvalue()) != offset:
+                return False
+
+            # drop anything an interrupted append left behind the rows the header counts
+            f.seek(offset + shape[0] * rows[0].nbytes)
+            f.truncate()
+            f.write(np.ascontiguousarray(rows, dtype=dtype).tobytes())
+            f.flush()
+            f.seek(0)
+            f.write(header.getvalue())
+        return True
@@ -0,0 +1,225 @@
+import queue
+import threading
+import time
+import numpy as np
+from .collect_data.tools.SQL_ORM import DotORM
+from .collect_data.tools.variables.constants import INGEST_QUEUE_SIZE, INGEST_MAX_BATCH_DOTS, INGEST_MAX_DELAY, \
+    INGEST_REPORT_INTERVAL, INGEST_COMMIT_RETRIES, INGEST_RETRY_DELAY
+
+
+class IngestWriter:
+    """
+    The single writer of the collected dots.
+
+    The NetS handlers of all the collectors submit their DATABL batches to a bounded queue instead of writing
+    to the database themselves. One writer thread drains it and inserts the pending batches of all the users
+    in a single transaction (a group commit), once 'max_batch_dots' dots are pending or the oldest of them
+    waited 'max_delay' seconds, so the collectors never contend on the database lock.
+
+    A failed commit is retried 'retries' times, with a growing delay. If it still fails, the batch of every
+    user is written (and retried) on its own, so only the batches that keep failing are lost.
+
+    Attributes:
+    - max_batch_dots: The number of pending dots that triggers a commit.
+    - max_delay: The number of seconds a pending dot may wait before it is committed.
+    - retries: The number of times a failed commit is retried.
+    - db: A DotORM instance used to interact with a database.
+
+    Methods:
+    - start(self)
+      Starts the writer thread.
+
+    - stop(self)
+      Commits everything that is queued and stops the writer thread.
+
+    - submit(self, id: int, dots: np.ndarray, weights: np.ndarray = None) -> bool
+      Queues a batch of dots of a user.
+
+    - flush(self, timeout: float = None) -> bool
+      Waits until everything submitted so far is committed.
+
+    - stats(self) -> dict
+      The queue depth and the commit statistics.
+    """
+    def __init__(self, max_queue: int = INGEST_QUEUE_SIZE, max_batch_dots: int = INGEST_MAX_BATCH_DOTS,
+                 max_delay: float = INGEST_MAX_DELAY, retries: int = INGEST_COMMIT_RETRIES) -> None:
+        self.max_batch_dots = max_batch_dots
+        self.max_delay = max_delay
+        self.retries = retries
+        self.db = DotORM()
+
+        # guards 'active' together with the puts, so nothing is queued behind the stop marker
+        self.active_lock = threading.Lock()
+        self.active = False
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.writer = None
+
+        self.stats_lock = threading.Lock()
+        self.commits = 0
+        self.dots = 0
+        self.failed_dots = 0
+        self.retried_commits = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    def start(self) -> None:
+        """
+        Starts the writer thread.
+        """
+        self.writer = threading.Thread(target=self.__write)
+        self.writer.start()
+        with self.active_lock:
+            self.active = True
+
+    def stop(self) -> None:
+        """
+        Stops accepting batches, commits everything that is already queued and stops the writer thread.
+        """
+        with self.active_lock:
+            if not self.active:
+                return
+            self.active = False
+            self.queue.put(None)
+        self.writer.join()
+
+    def submit(self, id: int, dots: np.ndarray, weights: np.ndarray = None) -> bool:
+        """
+        Queues a batch of dots of a user, blocks while the queue is full.
+
+        Args:
+        - id: The ID of the user.
+        - dots: A 2D array of shape (N, 3) holding the x, y, and v values of the dots.
+        - weights: The weight of every dot (see DataUtils.dedup_dots), None for a weight of 1.
+
+        Returns:
+        - True if the batch was queued, False if the writer is stopped (the caller has to write it itself).
+        """
+        with self.active_lock:
+            if not self.active:
+                return False
+            self.queue.put((id, dots, weights))
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Waits until every batch submitted before the call is committed.
+
+        Args:
+        - timeout: The maximum number of seconds to wait, None to wait as long as needed.
+
+        Returns:
+        - True if everything was committed (or the writer is stopped), False on timeout.
+        """
+        done = threading.Event()
+        with self.active_lock:
+            if not self.active:
+                return True
+            self.queue.put(done)
+        return done.wait(timeout)
+
+    def stats(self) -> dict:
+        """
+        The statistics of the writer.
+
+        Returns:
+        - A dict with the queue depth, the number of commits, committed and failed dots, the number of
+          retried commits, and the last, average and maximum commit latency in seconds.
+        """
+        with self.stats_lock:
+            return {
+                'queue_depth': self.queue.qsize(),
+                'commits': self.commits,
+                'dots': self.dots,
+                'failed_dots': self.failed_dots,
+                'retried_commits': self.retried_commits,
+                'last_latency': self.last_latency,
+                'avg_latency': self.total_latency / self.commits if self.commits else 0.0,
+                'max_latency': self.max_latency,
+            }
+
+    # Private method run by the writer thread.
+    # Collects queued batches until a commit is due (enough dots, the oldest waited long enough, a flush
+    # marker or the stop marker), then commits them together and releases the flush markers behind them.
+    def __write(self) -> None:
+        last_report = time.time()
+        running = True
+        while running:
+            groups, markers = [], []
+            pending, deadline = 0, None
+            while True:
+                timeout = None if deadline is None else max(deadline - time.time(), 0)
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    markers.append(item)
+                    break
+                groups.append(item)
+                pending += len(item[1])
+                if deadline is None:
+                    deadline = time.time() + self.max_delay
+                if pending >= self.max_batch_dots:
+                    break
+
+            self.__commit(groups, pending)
+            for marker in markers:
+                marker.set()
+
+            if time.time() - last_report >= INGEST_REPORT_INTERVAL:
+                last_report = time.time()
+                self.__report()
+
+    # Private method to commit the collected batches of all the users in one transaction.
+    # When the group commit keeps failing, every batch is committed on its own, so a batch that can not be
+    # written only costs its own user's dots.
+    def __commit(self, groups: list, pending: int) -> None:
+        if groups == []:
+            return
+        start = time.time()
+        if not self.__insert_with_retries(groups):
+            for group in groups:
+                if not self.__insert_with_retries([group]):
+                    print(f'Ingest of {len(group[1])} dots of user {group[0]} failed, the dots are lost')
+                    with self.stats_lock:
+                        self.failed_dots += len(group[1])
+                    pending -= len(group[1])
+        latency = time.time() - start
+        if pending == 0:
+            return
+
+        with self.stats_lock:
+            self.commits += 1
+            self.dots += pending
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_latency += latency
+
+    # Private method to insert batches in one transaction, retried with a growing delay.
+    # Returns True if they were committed.
+    def __insert_with_retries(self, groups: list) -> bool:
+        delay = INGEST_RETRY_DELAY
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                with self.stats_lock:
+                    self.retried_commits += 1
+                time.sleep(delay)
+                delay *= 2
+            try:
+                self.db.insert_dots_groups(groups)
+                return True
+            except Exception as e:
+                print(f'Ingest commit of {sum(len(group[1]) for group in groups)} dots failed '
+                      f'(attempt {attempt + 1} of {self.retries + 1}): {e}')
+        return False
+
+    # Private method to print the statistics of the writer.
+    def __report(self) -> None:
+        stats = self.stats()
+        print(f"Ingest: queue depth {stats['queue_depth']} | {stats['dots']} dots in {stats['commits']} commits "
+              f"| commit latency avg {stats['avg_latency'] * 1000:.1f}ms, max {stats['max_latency'] * 1000:.1f}ms "
+              f"| {stats['failed_dots']} dots failed, {stats['retried_commits']} commits retried")
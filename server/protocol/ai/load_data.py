@@ -1,5 +1,6 @@
 from .collect_data.tools.SQL_ORM import DotORM
 from .collect_data.tools.data_utils import DataUtils
+from .dataset_cache import DatasetCache
 
 
 class FormatData:
@@ -32,30 +33,26 @@ class FormatData:
         Returns:
             int: The number of rows in the user data table.
         """
-        return len(self.db.get_user_data(self.id))
+        return self.db.count_dots(self.id)
 
     def load_existing(self):
         """
-        Loads existing user data from the database and normalizes it.
+        Loads existing user data, normalized, from the user's cached dataset (see DatasetCache).
+        Only the dots inserted since the cache was last used are read from the database.
 
         Args:
             None
 
         Returns:
-            numpy.ndarray: The normalized user data.
+            numpy.ndarray: The normalized user data (read-only, memory-mapped).
         """
-        # Get the raw data for the current instance's ID from the database
-        raw_data = self.db.get_user_data(self.id)
-
-        # Get the maximum value for the current instance's ID from the database
-        max_v = self.db.get_max_v(self.id)
-
-        # Normalize the data using the DataUtils.normalize_data() method
-        return DataUtils.normalize_data(raw_data, max_v)
+        return DatasetCache().load(self.id)
 
     def load_others_existing(self):
         """
-        Loads existing data for all other users from the database and normalizes it.
+        Loads data of the other users from the database and normalizes it.
+        The data comes from the fixed-size cross-user sample (see DotORM.get_others_sample),
+        so the cost does not grow with the total number of stored dots.
 
         Args:
             None
@@ -63,8 +60,8 @@ class FormatData:
         Returns:
             numpy.ndarray: The normalized data for all other users.
         """
-        # Get the raw data for all other users from the database
-        raw_data = self.db.get_others_data(self.id)
+        # Get the sampled raw data of the other users from the database
+        raw_data = self.db.get_others_sample(self.id)
 
         # Get the maximum value for the current instance's ID from the database
         max_v = self.db.get_max_v(self.id)
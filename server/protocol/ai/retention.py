@@ -0,0 +1,86 @@
+import threading
+from .collect_data.tools.SQL_ORM import DotORM
+from .collect_data.tools.variables.constants import RETENTION_MAX_DOTS, RETENTION_TARGET_DOTS, RETENTION_INTERVAL
+
+
+class RetentionPolicy:
+    """
+    Keeps the size of the database flat as the collectors keep sending dots.
+
+    A background thread runs every 'interval' seconds. Every user with more than 'max_dots' dots is
+    downsampled back to 'target_dots' (see DotORM.compact_user): only dots their network was already
+    trained on are removed, evenly over time, and the kept ones are rewritten as compact chunks.
+    Then the free pages are released to the file system with an incremental VACUUM.
+
+    Attributes:
+    - max_dots: The number of dots above which a user is downsampled.
+    - target_dots: The number of dots a downsampled user is left with.
+    - interval: The number of seconds between two runs.
+    - db: A DotORM instance used to interact with a database.
+
+    Methods:
+    - start(self)
+      Starts the background thread.
+
+    - stop(self)
+      Stops the background thread.
+
+    - run_once(self) -> int
+      Applies the policy to every user and vacuums the database.
+    """
+    def __init__(self, max_dots: int = RETENTION_MAX_DOTS, target_dots: int = RETENTION_TARGET_DOTS,
+                 interval: float = RETENTION_INTERVAL) -> None:
+        self.max_dots = max_dots
+        self.target_dots = target_dots
+        self.interval = interval
+        self.db = DotORM()
+
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self) -> None:
+        """
+        Starts the background thread, the first run happens after one interval.
+        """
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.__run)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background thread, waits for a running pass to finish.
+        """
+        self.stopped.set()
+        self.thread.join()
+
+    def run_once(self) -> int:
+        """
+        Downsamples every user that is over the cap, then vacuums the database.
+
+        Returns:
+        - The number of dots removed.
+        """
+        removed = 0
+        for id in self.db.get_all_id():
+            if self.stopped.is_set():
+                break
+            if self.db.count_dots(id) <= self.max_dots:
+                continue
+
+            # only what the user's network was trained on may go, newer dots are always kept
+            watermark = self.db.get_training_watermark(id)
+            if watermark == 0:
+                continue
+            new_dots = self.db.count_dots_since(id, watermark)
+            removed += self.db.compact_user(id, watermark, max(self.target_dots - new_dots, 0))
+
+        free_pages = self.db.incremental_vacuum()
+        print(f'Retention: {removed} dots removed, {free_pages} free pages left')
+        return removed
+
+    def __run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f'Retention failed: {e}')
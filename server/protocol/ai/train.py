@@ -1,7 +1,10 @@
 from .collect_data.tools.neural_network.network import Network
 from .collect_data.tools.neural_network.activations import sigmoid, sigmoid_deriv
+from .collect_data.tools.neural_network.training_result import TrainingResult
+from .collect_data.tools.neural_network.checkpoint import CheckpointManager
 from time import time
-from .collect_data.tools.variables.constants import MIN_DATA_AMOUNT
+from .collect_data.tools.variables.constants import MIN_DATA_AMOUNT, BATCH_SIZE, OPTIMIZER, \
+    MAX_TRAINING_EPOCHS, MAX_TRAINING_TIME, TRAINING_PATIENCE, PLATEAU_ACTION
 
 
 class Train:
@@ -49,7 +52,10 @@ class Train:
         return Network([3, 9, 27, 81, 243, 81, 27, 9, 3], 8*[sigmoid], 8*[sigmoid_deriv])
 
     @staticmethod
-    def trainNormal(network: Network, data_x: list, data_y: list, cost_to_stop=0.01):
+    def trainNormal(network: Network, data_x: list, data_y: list, cost_to_stop=0.01, batch_size=BATCH_SIZE,
+                    optimizer=OPTIMIZER, learning_rate=None, max_epochs=MAX_TRAINING_EPOCHS,
+                    max_time=MAX_TRAINING_TIME, patience=TRAINING_PATIENCE, plateau_action=PLATEAU_ACTION,
+                    checkpoint_name='network', sample_weights=None) -> TrainingResult:
         """
         Train a neural network with specified training data and a cost function.
 
@@ -58,21 +64,53 @@ class Train:
             data_x (list): A list of training inputs.
             data_y (list): A list of training outputs.
             cost_to_stop (float, optional): The cost function to stop training when the cost reaches this threshold. Defaults to 0.01.
+            batch_size (int, optional): The number of samples in every training mini-batch. Defaults to BATCH_SIZE.
+            optimizer (str or Optimizer, optional): The optimizer that updates the weights ('sgd', 'momentum', 'rmsprop', 'adam'). Defaults to OPTIMIZER.
+            learning_rate (float, optional): The learning rate of the optimizer. Defaults to the optimizer's own default.
+            max_epochs (int, optional): The maximum number of epochs, None for no limit. Defaults to MAX_TRAINING_EPOCHS.
+            max_time (float, optional): The maximum training time in seconds, None for no limit. Defaults to MAX_TRAINING_TIME.
+            patience (int, optional): Epochs without improvement that count as a plateau, None to disable. Defaults to TRAINING_PATIENCE.
+            plateau_action (str, optional): 'stop' or 'reduce_lr', what to do on a plateau. Defaults to PLATEAU_ACTION.
+            checkpoint_name (str, optional): The prefix of the checkpoint files saved while training. Defaults to 'network'.
+            sample_weights (list, optional): The weight of every training sample (see DataUtils.dedup_dots). Defaults to None, equal weights.
 
         Returns:
-            Network: The trained neural network object.
+            TrainingResult: The trained network, the reason training stopped and the best cost reached.
+        """
+        return Train.__run(network, checkpoint_name, lambda checkpoint: network.train(
+            data_x, data_y, learning_rate, cost_to_stop, batch_size, optimizer, max_epochs, max_time, patience,
+            plateau_action=plateau_action, checkpoint=checkpoint, sample_weights=sample_weights))
+
+    @staticmethod
+    def __run(network: Network, checkpoint_name: str, train) -> TrainingResult:
+        """
+        Runs a training between the start and end banners, with checkpoints saved in the background.
+
+        Args:
+            network (Network): The neural network object being trained.
+            checkpoint_name (str): The prefix of the checkpoint files.
+            train (callable): Runs the training with the CheckpointManager it is given, returns its TrainingResult.
+
+        Returns:
+            TrainingResult: The result of the training.
         """
         print('>>>>>>>>>>>>>>>>\t\tTraining Started\t\t<<<<<<<<<<<<<<<<')
         start_time = time()
-        network.train(data_x, data_y, 0.1, cost_to_stop)
+        checkpoint = CheckpointManager(checkpoint_name)
+        result = train(checkpoint)
+        # the final weights are always saved
+        checkpoint.save(network, result.epochs)
+        checkpoint.close()
         end_time = time()
         print(
-            f'>>>>>>>>>>>>>>>>\tTraining Ended after {int((end_time-start_time)/60)} minutes\t\t<<<<<<<<<<<<<<<<')
+            f'>>>>>>>>>>>>>>>>\tTraining Ended after {int((end_time-start_time)/60)} minutes ({result.reason}, best cost: {result.best_cost})\t\t<<<<<<<<<<<<<<<<')
 
-        return network
+        return result
 
     @staticmethod
-    def train(network: Network, data: list, cost_to_stop=0.01):
+    def train(network: Network, data: list, cost_to_stop=0.01, batch_size=BATCH_SIZE, optimizer=OPTIMIZER, learning_rate=None,
+              max_epochs=MAX_TRAINING_EPOCHS, max_time=MAX_TRAINING_TIME, patience=TRAINING_PATIENCE,
+              plateau_action=PLATEAU_ACTION, checkpoint_name='network', sample_weights=None) -> TrainingResult:
         """
         Train a neural network with specified training data and a cost function (Auto Encoder).
 
@@ -80,8 +118,18 @@ class Train:
             network (Network): The neural network object to be trained.
             data (list): A list of training inputs and outputs.
             cost_to_stop (float, optional): The cost function to stop training when the cost reaches this threshold. Defaults to 0.01.
+            batch_size (int, optional): The number of samples in every training mini-batch. Defaults to BATCH_SIZE.
+            optimizer (str or Optimizer, optional): The optimizer that updates the weights. Defaults to OPTIMIZER.
+            learning_rate (float, optional): The learning rate of the optimizer. Defaults to the optimizer's own default.
+            max_epochs (int, optional): The maximum number of epochs, None for no limit. Defaults to MAX_TRAINING_EPOCHS.
+            max_time (float, optional): The maximum training time in seconds, None for no limit. Defaults to MAX_TRAINING_TIME.
+            patience (int, optional): Epochs without improvement that count as a plateau, None to disable. Defaults to TRAINING_PATIENCE.
+            plateau_action (str, optional): 'stop' or 'reduce_lr', what to do on a plateau. Defaults to PLATEAU_ACTION.
+            checkpoint_name (str, optional): The prefix of the checkpoint files saved while training. Defaults to 'network'.
+            sample_weights (list, optional): The weight of every training sample (see DataUtils.dedup_dots). Defaults to None, equal weights.
 
         Returns:
-            Network: The trained neural network object.
+            TrainingResult: The trained network, the reason training stopped and the best cost reached.
         """
-        return Train.trainNormal(network, data, data, cost_to_stop)
+        return Train.trainNormal(network, data, data, cost_to_stop, batch_size, optimizer, learning_rate,
+                                 max_epochs, max_time, patience, plateau_action, checkpoint_name, sample_weights)
@@ -0,0 +1,201 @@
+import base64
+import heapq
+import itertools
+import pickle
+import threading
+from concurrent.futures import Executor
+from .collect_data.tools.SQL_ORM import DotORM
+from .collect_data.tools.variables.constants import TRAINING_COST_TO_STOP, RETRAIN_MIN_NEW_DOTS
+from .dataset_cache import DatasetCache
+from .train import Train
+from . import training_worker
+
+
+class TrainingScheduler:
+    """
+    Schedules the training of the users' networks.
+
+    Training jobs are kept in a priority queue (lower priority value first, FIFO among equals) and are
+    dispatched to a process pool, at most 'max_concurrent' at a time. A user is never queued twice.
+    Jobs are requested by events (a user finished sending data, a new account) instead of polling.
+    A user without a network gets a new one trained on all their data. A user with a network is retrained
+    incrementally (warm start) on the dots inserted since their training watermark, once there are at
+    least RETRAIN_MIN_NEW_DOTS of them.
+
+    Attributes:
+    - pool: The executor the training jobs run in.
+    - max_concurrent: The maximum number of jobs running at once.
+    - lock: A lock held around reads and writes of the networks in the database.
+    - db: A DotORM instance used to interact with a database.
+    - datasets: The DatasetCache the training datasets are read from.
+
+    Methods:
+    - start(self)
+      Starts dispatching jobs.
+
+    - stop(self)
+      Stops dispatching jobs, running jobs are left to finish.
+
+    - check_user(self, id: int) -> bool
+      Queues a training job for a user who has enough data and no network yet, or enough new data for a retraining.
+
+    - notify_data(self, id: int, data_len: int) -> bool
+      Same as check_user, when the number of dots of the user is already known.
+
+    - request_training(self, id: int, priority: int = PRIORITY_NEW) -> bool
+      Queues a training job for a user.
+    """
+    PRIORITY_NEW = 0  # first network of a user
+    PRIORITY_RETRAIN = 1  # incremental retraining of an existing network
+
+    def __init__(self, pool: Executor, max_concurrent: int, lock: threading.Lock = None) -> None:
+        self.pool = pool
+        self.max_concurrent = max_concurrent
+        self.lock = lock if lock is not None else threading.Lock()
+        self.db = DotORM()
+        self.datasets = DatasetCache()
+
+        self.active = False
+        self.condition = threading.Condition()
+        self.queue = []
+        self.counter = itertools.count()
+        self.scheduled = set()  # users that are queued or running
+        self.running = 0
+        self.dispatcher = None
+
+    def start(self) -> None:
+        """
+        Starts the dispatcher thread.
+        """
+        self.active = True
+        self.dispatcher = threading.Thread(target=self.__dispatch)
+        self.dispatcher.start()
+
+    def stop(self) -> None:
+        """
+        Stops the dispatcher thread, queued jobs are dropped and running jobs are left to finish in the pool.
+        """
+        with self.condition:
+            self.active = False
+            self.queue.clear()
+            self.condition.notify_all()
+        self.dispatcher.join()
+
+    def check_user(self, id: int) -> bool:
+        """
+        Queues a training job for a user if they have enough data and no network yet,
+        or a retraining if enough dots were inserted since their last training.
+
+        Args:
+        - id: The ID of the user.
+
+        Returns:
+        - True if a job was queued.
+        """
+        return self.notify_data(id, self.db.count_dots(id))
+
+    def notify_data(self, id: int, data_len: int) -> bool:
+        """
+        Queues a training job for a user who has 'data_len' dots, if it is enough and they have no network yet,
+        or a retraining if enough dots were inserted since their last training.
+
+        Args:
+        - id: The ID of the user.
+        - data_len: The number of dots of the user.
+
+        Returns:
+        - True if a job was queued.
+        """
+        if id == 0 or id in self.scheduled or not Train.check_if_data_is_enough(data_len):
+            return False
+        with self.lock:
+            has_network = self.db.has_neural_network(id)
+        if not has_network:
+            return self.request_training(id, TrainingScheduler.PRIORITY_NEW)
+
+        new_data_len = self.db.count_dots_since(id, self.db.get_training_watermark(id))
+        if new_data_len >= RETRAIN_MIN_NEW_DOTS:
+            return self.request_training(id, TrainingScheduler.PRIORITY_RETRAIN)
+        return False
+
+    def request_training(self, id: int, priority: int = PRIORITY_NEW) -> bool:
+        """
+        Queues a training job for a user.
+
+        Args:
+        - id: The ID of the user.
+        - priority: The priority of the job, lower values run first.
+
+        Returns:
+        - True if the job was queued, False if the user is already queued or running.
+        """
+        with self.condition:
+            if id in self.scheduled:
+                return False
+            self.scheduled.add(id)
+            heapq.heappush(self.queue, (priority, next(self.counter), id))
+            self.condition.notify_all()
+        print(f'Training of user {id} scheduled (priority {priority})')
+        return True
+
+    def __dispatch(self) -> None:
+        while True:
+            with self.condition:
+                while self.active and (not self.queue or self.running >= self.max_concurrent):
+                    self.condition.wait()
+                if not self.active:
+                    return
+                priority, _, id = heapq.heappop(self.queue)
+                self.running += 1
+
+            try:
+                self.__start_job(id)
+            except Exception as e:
+                print(f'Training of user {id} could not start: {e}')
+                self.__job_done(id)
+
+    # Private method to start the training of a user in the pool.
+    # A user without a network is trained on all their data, a user with a network is
+    # fine-tuned on the dots inserted since their watermark. The user's cached dataset is brought up to
+    # date here and the worker maps it, the result is stored by __finish_job once the worker is done.
+    def __start_job(self, id: int) -> None:
+        with self.lock:
+            model = self.db.get_neural_network(id)
+
+        dataset = self.datasets.update(id)
+        watermark = dataset['watermark']
+        if model == False:
+            model = None
+            start = 0
+        else:
+            # the rows after the training watermark are the last ones of the dataset
+            new_rows = self.db.count_dots_since(id, self.db.get_training_watermark(id)) \
+                - self.db.count_dots_since(id, watermark)
+            start = max(dataset['count'] - new_rows, 0)
+            if not isinstance(model, bytes):  # pickled by an older version
+                model = pickle.loads(base64.b64decode(model)).to_bytes()
+            if start == dataset['count']:
+                self.__job_done(id)
+                return
+
+        future = self.pool.submit(training_worker.train_user, id, self.datasets.path(id), start,
+                                  TRAINING_COST_TO_STOP, model)
+        future.add_done_callback(lambda future: self.__finish_job(id, watermark, future))
+
+    def __finish_job(self, id: int, watermark: int, future) -> None:
+        try:
+            network = future.result()
+            with self.lock:
+                self.db.dump_neural_network(id, network)
+            self.db.set_training_watermark(id, watermark)
+            print(f'Training of user {id} done')
+        except Exception as e:
+            print(f'Training of user {id} failed: {e}')
+        finally:
+            self.__job_done(id)
+
+    def __job_done(self, id: int) -> None:
+        with self.condition:
+            self.running -= 1
+            self.scheduled.discard(id)
+            self.condition.notify_all()
@@ -0,0 +1,40 @@
+import numpy as np
+from .train import Train
+from .dataset_cache import DatasetCache
+from .collect_data.tools.neural_network.network import Network
+from .collect_data.tools.variables.constants import RETRAIN_MAX_EPOCHS, RETRAIN_LEARNING_RATE
+
+# Functions that run inside the training worker processes of MainServer.
+# They are module level so the process pool can pickle them by name.
+
+
+def train_user(id: int, dataset_path: str, start: int, cost_to_stop: float, model: bytes = None) -> bytes:
+    """
+    Trains a new network for a user on their cached dataset, or fine-tunes the user's
+    existing network (warm start) when 'model' is given.
+
+    The dataset is memory-mapped, so it is shared with the server and the other workers through the
+    page cache instead of being read from the database or pickled through the pool's pipe.
+    Every dot counts as many times as its weight (the idle dots it stands for).
+
+    Args:
+        id (int): The ID of the user.
+        dataset_path (str): The path of the user's dataset (see DatasetCache).
+        start (int): The first row of the dataset to train on.
+        cost_to_stop (float): The cost at which training stops.
+        model (bytes, optional): The existing network in the binary model format, None to train a new network.
+
+    Returns:
+        bytes: The trained network in the binary model format.
+    """
+    data, weights = DatasetCache.split(np.load(dataset_path, mmap_mode='r')[start:])
+    if model is None:
+        network = Train.create_new_network()
+        network = Train.train(network, data, cost_to_stop, checkpoint_name=f'user_{id}',
+                              sample_weights=weights).network
+    else:
+        network = Network.from_bytes(model, copy=True)
+        network = Train.train(network, data, cost_to_stop, learning_rate=RETRAIN_LEARNING_RATE,
+                              max_epochs=RETRAIN_MAX_EPOCHS, checkpoint_name=f'user_{id}',
+                              sample_weights=weights).network
+    return network.to_bytes()
@@ -1,11 +1,15 @@
 from .ai.collect_data.tools.basic_classes.server import Server
 from .protocol_for_server import NetS
 from .ai.collect_data.tools.SQL_ORM import DotORM
-from .ai.train import Train
-from .ai.load_data import FormatData
+from .ai.collect_data.tools.storage_engine import StorageEngine
+from .ai.training_scheduler import TrainingScheduler
+from .ai.ingest_writer import IngestWriter
+from .ai.retention import RetentionPolicy
+from .ai.collect_data.tools.variables.constants import TRAINING_WORKERS, MAX_CONCURRENT_TRAININGS
+from concurrent.futures import ProcessPoolExecutor
 import threading
 import socket
-from time import sleep
+import os
 
 
 class MainServer(Server):
@@ -14,10 +18,13 @@ class MainServer(Server):
 
     Attributes:
     - db: A DotORM instance used to interact with a database.
-    - training_active: A boolean that indicates if training is currently active or not.
-    - users_training_thread: A dictionary that maps a client ID to its corresponding thread for training.
-    - users_data_formator: A dictionary that maps a client ID to its corresponding data formatter.
     - lock: A threading lock used to synchronize threads that access shared resources.
+    - training_workers: The number of worker processes the networks are trained in.
+    - max_concurrent_trainings: The maximum number of trainings running at once.
+    - training_pool: The process pool the training jobs run in (while the server is active).
+    - scheduler: The TrainingScheduler that queues and dispatches the training jobs (while the server is active).
+    - ingest: The IngestWriter that writes the dots of all the clients (while the server is active).
+    - retention: The RetentionPolicy that bounds the stored dots (while the server is active).
 
     Inherited Attributes:
     - host: A string that represents the IP address of the server.
@@ -25,7 +32,8 @@ class MainServer(Server):
     - max_capacity: An integer that represents the maximum number of connections to accept.
 
     Methods:
-    - __init__(self, host: str, port: int, max_capacity: int = 20)
+    - __init__(self, host: str, port: int, max_capacity: int = 20, training_workers: int = TRAINING_WORKERS,
+               max_concurrent_trainings: int = MAX_CONCURRENT_TRAININGS, engine: StorageEngine = None)
       Initializes a new instance of the MainServer class.
 
     - _create_client_object(self, sock: socket.socket, t_id: int) -> NetS
@@ -33,18 +41,19 @@ class MainServer(Server):
 
     - activate(self) -> bool
       Activates the server and starts training neural networks for connected clients.
+      Opens the database connection pool (switching the database to incremental auto-vacuum once) and starts
+      the ingest writer and the retention policy.
 
     - deactivate(self) -> bool
       Deactivates the server and stops training neural networks.
+      Stops the retention policy and the ingest writer and closes the database connection pool.
 
-    - __train_neural_networks(self)
-      Trains neural networks for all connected clients.
-
-    - __train_neural_network(self, id: int)
-      Trains a neural network for a specific client.
+    - __schedule_existing_users(self)
+      Queues the training of every existing user who is ready for it.
 
     """
-    def __init__(self, host: str, port: int, max_capacity: int = 20):
+    def __init__(self, host: str, port: int, max_capacity: int = 20, training_workers: int = TRAINING_WORKERS,
+                 max_concurrent_trainings: int = MAX_CONCURRENT_TRAININGS, engine: StorageEngine = None):
         """
         Initializes a new instance of the MainServer class.
 
@@ -52,12 +61,22 @@ class MainServer(Server):
         - host: A string that represents the IP address of the server.
         - port: An integer that represents the port number to bind the server to.
         - max_capacity: An integer that represents the maximum number of connections to accept.
+        - training_workers: The number of worker processes used for training, None for one per CPU core.
+        - max_concurrent_trainings: The maximum number of trainings running at once, None for one per worker.
+        - engine: The storage engine of the process (for example a MemoryEngine to benchmark the server
+          without the database), None to keep the current one (the SQLite database by default).
         """
+        if engine is not None:
+            DotORM.use_engine(engine)
         self.db = DotORM()
-        self.training_active = False
-        self.users_training_thread = {}
-        self.users_data_formator = {}
         self.lock = threading.Lock()
+        self.training_workers = training_workers if training_workers is not None else os.cpu_count()
+        self.max_concurrent_trainings = max_concurrent_trainings if max_concurrent_trainings is not None \
+            else self.training_workers
+        self.training_pool = None
+        self.scheduler = None
+        self.ingest = None
+        self.retention = None
 
         super().__init__(host, port, max_capacity)
 
@@ -72,7 +91,7 @@ class MainServer(Server):
         Returns:
         - A new instance of the NetS class.
         """
-        return NetS(sock, t_id, self.threads_to_die)
+        return NetS(sock, t_id, self.threads_to_die, self.scheduler, self.ingest)
 
     def activate(self) -> bool:
         """
@@ -81,8 +100,17 @@ class MainServer(Server):
         Returns:
         - True if the server was activated successfully, False otherwise.
         """
-        self.training_active = True
-        self.__train_neural_networks()
+        DotORM.open_pool()
+        # the one-time switch rewrites the database, it must happen before anything writes to it
+        self.db.enable_incremental_vacuum()
+        self.ingest = IngestWriter()
+        self.ingest.start()
+        self.retention = RetentionPolicy()
+        self.retention.start()
+        self.training_pool = ProcessPoolExecutor(max_workers=self.training_workers)
+        self.scheduler = TrainingScheduler(self.training_pool, self.max_concurrent_trainings, self.lock)
+        self.scheduler.start()
+        self.__schedule_existing_users()
         return super().activate()
 
     def deactivate(self) -> bool:
@@ -92,52 +120,20 @@ class MainServer(Server):
         Returns:
         - True if the server was deactivated successfully, False otherwise.
         """
-        self.training_active = False
-        for id, thread in self.users_training_thread.items():
-            thread.join()
-        return super().deactivate()
-
-    # Private method to train neural networks for all users in the database.
-    # This method retrieves all user IDs from the database and creates a new FormatData object for each user.
-    # It then creates a new thread for training the neural network of each user and starts the thread.
-    def __train_neural_networks(self):
+        self.retention.stop()
+        self.scheduler.stop()
+        self.training_pool.shutdown(wait=True, cancel_futures=True)
+        result = super().deactivate()
+        self.ingest.stop()
+        DotORM.close_pool()
+        return result
+
+    # Private method to queue the training of the users that already exist in the database.
+    # Users who reach the required amount of data later are queued by their NetS handler (ENDATA).
+    def __schedule_existing_users(self):
         all_id = self.db.get_all_id()
         if 0 in all_id:
             all_id.remove(0)
 
         for id in all_id:
-            if id not in self.users_data_formator.keys():
-                self.users_data_formator[id] = FormatData(id)
-
-            self.users_training_thread[id] = threading.Thread(
-                target=self.__train_neural_network, args=(id,))
-            self.users_training_thread[id].start()
-
-    # Private method to train the neural network of a single user.
-    # This method continuously checks if there is enough data to train the neural network.
-    # If there is enough data, it retrieves the neural network from the database and trains it using the user's data.
-    # If the neural network does not exist in the database, a new neural network is created and trained with the user's data.
-    # The trained neural network is then dumped back into the database.
-    # This method sleeps for an hour before repeating the process, unless the training_active flag is set to False.
-    def __train_neural_network(self, id: int):
-        while self.training_active:
-            data_cnt = self.users_data_formator[id].data_cnt()
-            if Train.check_if_data_is_enough(data_cnt):
-                self.lock.acquire()
-                network = self.db.get_neural_network(id)
-                self.lock.release()
-
-                if network == False:  # this is first time training, create a new network
-                    network = Train.create_new_network()
-                    data = self.users_data_formator[id].load_existing()
-                    network = Train.train(network, data, 0.0015)
-
-                    self.lock.acquire()
-                    self.db.dump_neural_network(id, network)
-                    self.lock.release()
-
-            for i in range(3600):  # sleep 1 hour
-                if not self.training_active:  # check every second
-                    break
-                sleep(1)
-
+            self.scheduler.check_user(id)
@@ -8,6 +8,8 @@ from .ai.collect_data.tools.SQL_ORM import DotORM
 from .ai.collect_data.tools.basic_classes.hash256 import Hashing
 from .ai.collect_data.tools.basic_classes.user import User
 from .ai.train import Train
+from .ai.collect_data.tools.data_utils import DataUtils
+from .ai.dataset_cache import DatasetCache
 import pickle
 import base64
 from .ai.collect_data.tools.variables.constants import LIMIT
@@ -28,9 +30,11 @@ class NetS:
     - aes (AESCipher): Object for AES encryption.
     - recieving_data (bool): Flag for receiving data.
     - id (int): User ID.
+    - scheduler (TrainingScheduler): Scheduler notified when a user may be ready for training (or None).
+    - ingest (IngestWriter): Writer the received dots are queued to (or None to write them directly).
     """
 
-    def __init__(self, socket: socket.socket, t_id: int, exit_list: list):
+    def __init__(self, socket: socket.socket, t_id: int, exit_list: list, scheduler=None, ingest=None):
         """
         Initializes the NetS object.
 
@@ -38,6 +42,8 @@ class NetS:
         - socket (socket.socket): Socket object for communication.
         - t_id (int): Thread ID.
         - exit_list (list): List of exit signals.
+        - scheduler (TrainingScheduler): Scheduler of the training jobs, None to not schedule training.
+        - ingest (IngestWriter): Writer of the received dots, None to write them directly.
 
         Returns:
         - None
@@ -52,6 +58,8 @@ class NetS:
         self.aes = None
         self.recieving_data = False
         self.id = -1
+        self.scheduler = scheduler
+        self.ingest = ingest
 
     def __send_encrypted(self, message):
         """
@@ -160,7 +168,7 @@ class NetS:
 
     def delete_user(self, username):
         """
-        Function to delete a user from the database, if the client is an admin.
+        Function to delete a user from the database (and their cached dataset), if the client is an admin.
 
         Args:
             username (str): The username of the user to delete
@@ -169,9 +177,11 @@ class NetS:
             answer (str): The response indicating whether deletion was successful or not
         """
         answer = "DELETR~"
-        if self.db.is_admin(self.id):
+        if self.db.is_admin(self.id) and self.db.get_user_password(username):
+            id = self.db.get_id(username)
             success = self.db.delete_user(username)
             if success:
+                DatasetCache().remove(id)
                 return answer + 'TRUE'
         return answer + 'FALSE'
 
@@ -193,13 +203,19 @@ class NetS:
     def stop_data_saving(self):
         """
         Stops the instance from receiving data and returns whether enough data has been received for training.
+        The queued dots are committed first, then the training scheduler is notified, so a user who just
+        reached enough data is queued for training.
 
         Returns:
             str: A string containing the message 'TRAINE~TRUE' if enough data has been received for training,
                  or 'TRAINE~FALSE' otherwise.
         """
         self.recieving_data = False
+        if self.ingest is not None:
+            self.ingest.flush()
         data_len = self.db.count_dots(self.id)
+        if self.scheduler is not None:
+            self.scheduler.notify_data(self.id, data_len)
         ret_str = 'TRUE' if Train.check_if_data_is_enough(
             data_len) else 'FALSE'
         return f'TRAINE~{ret_str}'
@@ -216,7 +232,7 @@ class NetS:
 
     def save_dots(self, data):
         """
-        Saves a list of dots to the database.
+        Saves a list of dots to the database, in one transaction (queued to the ingest writer, if there is one).
 
         Args:
             data (str): A string containing the list of dots encoded in base64.
@@ -226,19 +242,25 @@ class NetS:
         """
         if self.recieving_data:
             data = pickle.loads(base64.b64decode(data.encode()))
-            for dot in data:
-                self.db.insert_dot_by_id(self.id, dot)
+            # older clients send every idle dot, the runs are collapsed into weighted dots here too
+            data = DataUtils.dedup_dots(data)
+            dots = DataUtils.dots_to_array(data)
+            weights = DataUtils.dots_to_weights(data)
+            if self.ingest is None or not self.ingest.submit(self.id, dots, weights):
+                self.db.insert_dots_bulk(self.id, dots, weights)
 
     def get_neural_network(self):
         """
         Returns the neural network associated with the user, if any.
 
         Returns:
-            str: A string containing the neural network encoded in base64, preceded by the string 'NETREP~',
+            str: A string containing the neural network (binary model format) encoded in base64, preceded by the string 'NETREP~',
                  and followed by the limit and email of the user separated by '~'. If there is no neural network,
                  the string 'NOEDAT' is returned.
         """
         network = self.db.get_neural_network(self.id)
+        if isinstance(network, bytes):
+            network = base64.b64encode(network).decode()
         limit = LIMIT
         email = self.db.get_email(self.id)
         if not network:
@@ -253,6 +275,7 @@ class NetS:
     def create_new_account(self, username: str, password: str, email: str) -> bool:
         """
         Creates a new account for a user.
+        A new user has no dots yet, the training scheduler hears about them once their data arrives (ENDATA).
 
         Args:
             username (str): The username for the new account.
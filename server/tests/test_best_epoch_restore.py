@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from protocol.ai.collect_data.tools.neural_network.network import Network
+from protocol.ai.collect_data.tools.neural_network.activations import sigmoid, sigmoid_deriv
+
+
+class EpochRecorder:
+    """
+    Stands in for a CheckpointManager and copies the weights and the optimizer state after every epoch.
+    """
+
+    def __init__(self) -> None:
+        self.epochs = []
+
+    def maybe_save(self, network: Network, epoch: int) -> None:
+        self.epochs.append([(layer.weights.copy(), {key: np.copy(value) for key, value in layer.optimizer_state.items()})
+                            for layer in network.layers])
+
+
+class BestEpochRestoreTest(unittest.TestCase):
+    """
+    When the best epoch is not the last one, its weights come back with the optimizer state of that epoch.
+    """
+
+    def test_optimizer_state_is_restored_with_the_weights(self):
+        np.random.seed(11)
+        x = np.random.rand(64, 3)
+        network = Network([3, 5, 3], 2 * [sigmoid], 2 * [sigmoid_deriv])
+        network.train(x, x, 1.0, cost_to_stop=0, batch_size=8, optimizer='momentum', max_epochs=20)
+
+        recorder = EpochRecorder()
+        # a learning rate this large overshoots, so the cost goes up again after the best epoch
+        result = network.train(x, x, 10.0, cost_to_stop=0, batch_size=8, optimizer='momentum', max_epochs=6,
+                               checkpoint=recorder)
+        self.assertLess(result.best_cost, result.last_cost)
+
+        best = [epoch for epoch in recorder.epochs
+                if all(np.array_equal(layer.weights, weights) for layer, (weights, state) in zip(network.layers, epoch))]
+        self.assertEqual(len(best), 1)
+        for layer, (weights, state) in zip(network.layers, best[0]):
+            self.assertEqual(layer.optimizer_state.keys(), state.keys())
+            for key in state:
+                np.testing.assert_array_equal(layer.optimizer_state[key], state[key])
+
+
+if __name__ == '__main__':
+    unittest.main()
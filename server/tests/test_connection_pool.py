@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import numpy as np
+from protocol.ai.collect_data.tools.sqlite_engine import SQLiteEngine
+from protocol.ai.collect_data.tools.basic_classes.user import User
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    """
+    Every thread reuses one pooled connection, and many threads can read and write through the pool at once.
+    """
+    threads = 6
+    rounds = 50
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.engine = SQLiteEngine(os.path.join(self.dir, 'data.db'))
+        self.engine.open_pool()
+        for k in range(self.threads):
+            self.engine.insert_user(User(f'user{k}', 'p', f'user{k}@x'))
+
+    def tearDown(self):
+        self.engine.close_pool()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_threads_read_and_write_through_their_own_connection(self):
+        errors, connections = [], {}
+
+        def work(k):
+            try:
+                id = self.engine.get_id(f'user{k}')
+                seen = set()
+                for i in range(self.rounds):
+                    self.engine.insert_dots_bulk(id, np.full((4, 3), i, dtype=float))
+                    seen.add(self.engine.conn)
+                    self.assertEqual(self.engine.count_dots(id), (i + 1) * 4)
+                    self.engine.get_user_data(id)
+                connections[k] = seen
+            except Exception as error:
+                errors.append(error)
+
+        workers = [threading.Thread(target=work, args=(k,)) for k in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        # one connection per thread, never shared
+        self.assertTrue(all(len(seen) == 1 for seen in connections.values()))
+        self.assertEqual(len(set.union(*connections.values())), self.threads)
+        for k in range(self.threads):
+            self.assertEqual(self.engine.count_dots(self.engine.get_id(f'user{k}')), self.rounds * 4)
+
+        # the connections of the ended threads are closed when the next thread joins the pool
+        late = threading.Thread(target=self.engine.get_all_id)
+        late.start()
+        late.join()
+        self.assertEqual(len(self.engine.pool), 2)  # the main thread's and the last thread's
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from protocol.ai.collect_data.tools.SQL_ORM import DotORM
+from protocol.ai.collect_data.tools.memory_engine import MemoryEngine
+from protocol.ai.collect_data.tools.basic_classes.user import User
+from protocol.ai.dataset_cache import DatasetCache
+
+
+class DatasetCacheTest(unittest.TestCase):
+    """
+    The cached dataset of a user must match the dots in the database, normalized.
+    """
+
+    def setUp(self):
+        self.previous = DotORM.default_engine
+        self.engine = MemoryEngine()
+        DotORM.use_engine(self.engine)
+        self.engine.insert_user(User('a', 'p', 'a@x'))
+        self.id = self.engine.get_id('a')
+        self.dir = tempfile.mkdtemp()
+        self.cache = DatasetCache(self.dir)
+
+    def tearDown(self):
+        DotORM.use_engine(self.previous)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_stationary_user_has_no_nan(self):
+        self.engine.insert_dots_bulk(self.id, np.array([[10.0, 20.0, 0.0], [30.0, 40.0, 0.0]]))
+        data = self.cache.load(self.id)
+        self.assertFalse(np.isnan(data).any())
+        np.testing.assert_array_equal(data[:, 2], 0)
+
+        # the first moving dots rescale the dataset
+        self.engine.insert_dots_bulk(self.id, np.array([[50.0, 60.0, 2.0], [70.0, 80.0, 1.0]]))
+        data = self.cache.load(self.id)
+        self.assertFalse(np.isnan(data).any())
+        np.testing.assert_allclose(data[:, 2], [0, 0, 1, 0.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import queue
+import threading
+import time
+import unittest
+import numpy as np
+from protocol.ai.collect_data.tools.SQL_ORM import DotORM
+from protocol.ai.collect_data.tools.memory_engine import MemoryEngine
+from protocol.ai.collect_data.tools.basic_classes.user import User
+from protocol.ai.ingest_writer import IngestWriter
+
+
+class SlowQueue(queue.Queue):
+    """
+    A queue that takes a while to put a batch, to stop the writer in the middle of a submit.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.putting = threading.Event()
+
+    def put(self, item, block=True, timeout=None) -> None:
+        if isinstance(item, tuple):
+            self.putting.set()
+            time.sleep(0.2)
+        super().put(item, block, timeout)
+
+
+class IngestWriterTest(unittest.TestCase):
+    """
+    Every batch the writer accepts is committed, a batch it refuses is left to the caller.
+    """
+    threads = 8
+    batches = 100
+
+    def setUp(self):
+        self.previous = DotORM.default_engine
+        self.engine = MemoryEngine()
+        DotORM.use_engine(self.engine)
+        self.engine.insert_user(User('a', 'p', 'a@x'))
+        self.id = self.engine.get_id('a')
+
+    def tearDown(self):
+        DotORM.use_engine(self.previous)
+
+    def test_flush_commits_everything_submitted(self):
+        writer = IngestWriter(max_batch_dots=50, max_delay=0.01)
+        writer.start()
+        workers = [threading.Thread(target=lambda: [writer.submit(self.id, np.full((5, 3), i, dtype=float))
+                                                    for i in range(self.batches)]) for k in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertTrue(writer.flush(timeout=10))
+        self.assertEqual(self.engine.count_dots(self.id), self.threads * self.batches * 5)
+        writer.stop()
+
+    def test_stop_during_a_submit_loses_nothing(self):
+        writer = IngestWriter(max_batch_dots=50, max_delay=0.01)
+        writer.queue = SlowQueue()
+        writer.start()
+        submitted = []
+        submitter = threading.Thread(target=lambda: submitted.append(writer.submit(self.id, np.ones((5, 3)))))
+        submitter.start()
+        # stop() is called while the batch is being put on the queue
+        writer.queue.putting.wait(5)
+        writer.stop()
+        submitter.join()
+        if not submitted[0]:
+            self.engine.insert_dots_bulk(self.id, np.ones((5, 3)))
+        self.assertEqual(self.engine.count_dots(self.id), 5)
+        # a flush after the stop returns at once instead of waiting on a writer that is gone
+        self.assertTrue(writer.flush())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import numpy as np
+from protocol.ai.collect_data.tools.SQL_ORM import DotORM
+from protocol.ai.collect_data.tools.sqlite_engine import SQLiteEngine
+from protocol.ai.collect_data.tools.basic_classes.user import User
+from protocol.ai.retention import RetentionPolicy
+
+
+class RetentionTest(unittest.TestCase):
+    """
+    The retention thread only removes trained dots, also while new dots are being inserted.
+    """
+
+    def setUp(self):
+        self.previous = DotORM.default_engine
+        self.dir = tempfile.mkdtemp()
+        self.engine = SQLiteEngine(os.path.join(self.dir, 'data.db'))
+        DotORM.use_engine(self.engine)
+        self.engine.open_pool()
+        self.engine.insert_user(User('a', 'p', 'a@x'))
+        self.id = self.engine.get_id('a')
+
+    def tearDown(self):
+        self.engine.close_pool()
+        DotORM.use_engine(self.previous)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_compaction_during_inserts_keeps_new_dots(self):
+        # 1000 trained dots (v below 1000), then new dots (v from 1000) while the policy runs
+        for start in range(0, 1000, 50):
+            self.engine.insert_dots_bulk(self.id, np.arange(start, start + 50)[:, None].repeat(3, axis=1))
+        self.engine.set_training_watermark(self.id, self.engine.get_last_dot_rowid(self.id))
+
+        policy = RetentionPolicy(max_dots=500, target_dots=300, interval=0.01)
+        policy.start()
+        for start in range(1000, 1500, 5):
+            self.engine.insert_dots_bulk(self.id, np.arange(start, start + 5)[:, None].repeat(3, axis=1))
+        # let a pass run after the last insert
+        deadline = time.time() + 10
+        while len(self.engine.get_user_data(self.id)) > 300 + 500 and time.time() < deadline:
+            time.sleep(0.01)
+        policy.stop()
+
+        data = self.engine.get_user_data(self.id)[:, 2]
+        np.testing.assert_array_equal(data[data >= 1000], np.arange(1000, 1500))
+        self.assertLess(np.count_nonzero(data < 1000), 1000)
+        self.assertTrue(np.all(np.diff(data) > 0))
+        self.assertEqual(self.engine.count_dots(self.id), len(data))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import numpy as np
+from protocol.ai.collect_data.tools import sqlite_engine
+from protocol.ai.collect_data.tools.sqlite_engine import SQLiteEngine
+from protocol.ai.collect_data.tools.memory_engine import MemoryEngine
+from protocol.ai.collect_data.tools.basic_classes.user import User
+from protocol.ai.collect_data.tools.basic_classes.dot import Dot
+
+
+class StorageEnginesTest(unittest.TestCase):
+    """
+    The same scenario must give the same results on SQLiteEngine and MemoryEngine.
+    """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.engines = {'sqlite': SQLiteEngine(os.path.join(self.dir, 'data.db')), 'memory': MemoryEngine()}
+
+    def tearDown(self):
+        for engine in self.engines.values():
+            engine.close_pool()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    @staticmethod
+    def __scenario(engine) -> dict:
+        # values that float32 can not hold exactly, so a difference in rounding would show
+        rng = np.random.default_rng(3)
+        first = rng.random((700, 3)) * [1919, 1079, 300] + 0.1
+        second = rng.random((300, 3)) * [1919, 1079, 300] + 0.1
+        results = {}
+
+        engine.open_pool()
+        results['users'] = [engine.insert_user(User('a', 'p', 'a@x')), engine.insert_user(User('b', 'q', 'b@x')),
+                            engine.insert_user(User('a', 'r', 'c@x'))]
+        a, b = engine.get_id('a'), engine.get_id('b')
+        results['ids'] = (a, b, engine.get_all_id(), engine.get_users_list())
+        engine.insert_dots_groups([(a, first, np.arange(len(first)) % 3 + 1.1), (b, second)])
+        engine.insert_dot('a', Dot(1.3, 2.7, 0.3, 2))
+
+        results['max_v'] = (engine.get_max_v(a), engine.get_max_v(b))
+        results['counts'] = (engine.count_dots(a), engine.count_dots(b))
+        stats = engine.get_user_stats(a)
+        results['stats'] = {key: stats[key] for key in ('count', 'max_v')}
+        data, weights, last = engine.get_user_weighted_data_since(a, 0)
+        results['data'] = (data.tolist(), weights.tolist(), last == engine.get_last_dot_rowid(a))
+        # the chunks of SQLiteEngine share one buffer
+        results['streamed'] = np.concatenate([chunk.copy() for chunk in engine.iter_user_data(a, 256)]).tolist()
+        results['others'] = engine.get_others_data(a).tolist()
+
+        engine.set_training_watermark(a, engine.get_last_dot_rowid(a) - 100)
+        results['since'] = engine.count_dots_since(a, engine.get_training_watermark(a))
+        results['compacted'] = engine.compact_user(a, engine.get_training_watermark(a), 50)
+        results['after_compact'] = (engine.count_dots(a), engine.get_max_v(a),
+                                    engine.get_user_data(a).tolist())
+        results['deleted'] = (engine.delete_user('b'), engine.get_all_id(), engine.count_dots(b))
+        return results
+
+    def test_same_results_on_both_engines(self):
+        sqlite_results = self.__scenario(self.engines['sqlite'])
+        memory_results = self.__scenario(self.engines['memory'])
+        for key, value in sqlite_results.items():
+            self.assertEqual(value, memory_results[key], key)
+
+
+
+class InsertionOrderTest(unittest.TestCase):
+    """
+    The dots of a user come back in insertion order, also when they are stored in both layouts.
+    """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.engine = SQLiteEngine(os.path.join(self.dir, 'data.db'))
+        self.engine.insert_user(User('a', 'p', 'a@x'))
+        self.engine.insert_user(User('b', 'q', 'b@x'))
+        self.a, self.b = self.engine.get_id('a'), self.engine.get_id('b')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def __insert(self, layout: str, start: int, count: int) -> None:
+        # the values count the dots of a user, so the expected order is 0, 1, 2...
+        with mock.patch.object(sqlite_engine, 'MOTION_STORAGE', layout):
+            for id in (self.a, self.b):
+                self.engine.insert_dots_bulk(id, np.arange(start, start + count)[:, None].repeat(3, axis=1))
+
+    def __assert_in_order(self, expected: np.ndarray) -> None:
+        data, weights, last = self.engine.get_user_weighted_data_since(self.a, 0)
+        np.testing.assert_array_equal(data[:, 0], expected)
+        np.testing.assert_array_equal(self.engine.get_user_data(self.a)[:, 0], expected)
+        streamed = np.concatenate([chunk[:, 0].copy() for chunk in self.engine.iter_user_data(self.a, 7)])
+        np.testing.assert_array_equal(streamed, expected)
+        streamed = np.concatenate([chunk[:, 0].copy() for chunk in self.engine.iter_others_data(self.a, 7)])
+        np.testing.assert_array_equal(streamed, expected)
+
+    def test_mixed_layouts_keep_insertion_order(self):
+        self.__insert('chunks', 0, 10)
+        self.__insert('rows', 10, 10)
+        self.__insert('chunks', 20, 10)
+        self.__insert('rows', 30, 10)
+        self.__assert_in_order(np.arange(40))
+
+    def test_compacted_rows_keep_insertion_order(self):
+        self.__insert('rows', 0, 20)
+        self.__insert('rows', 20, 10)
+        # the old rows are rewritten as chunks, the newer rows stay
+        self.engine.compact_user(self.a, self.engine.get_last_dot_rowid(self.a) - 19, 20)
+        self.engine.compact_user(self.b, self.engine.get_last_dot_rowid(self.b) - 19, 20)
+        self.__insert('rows', 30, 10)
+        self.__assert_in_order(np.arange(40))
+
+
+class ConcurrentInsertTest(unittest.TestCase):
+    """
+    Many threads inserting at once must not lose dots or share sequence numbers.
+    """
+    threads = 4
+    inserts = 200
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.engine = SQLiteEngine(os.path.join(self.dir, 'data.db'))
+        self.engine.open_pool()
+        self.engine.insert_user(User('a', 'p', 'a@x'))
+        self.id = self.engine.get_id('a')
+
+    def tearDown(self):
+        self.engine.close_pool()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_concurrent_inserts_keep_every_dot(self):
+        errors = []
+
+        def insert(k):
+            try:
+                for i in range(self.inserts):
+                    self.engine.insert_dots_bulk(self.id, np.full((3, 3), k * self.inserts + i, dtype=float))
+            except Exception as error:
+                errors.append(error)
+
+        workers = [threading.Thread(target=insert, args=(k,)) for k in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        total = self.threads * self.inserts * 3
+        self.assertEqual(self.engine.count_dots(self.id), total)
+        data = self.engine.get_user_data(self.id)
+        self.assertEqual(len(data), total)
+        # every insert is found whole, once
+        values, counts = np.unique(data[:, 0], return_counts=True)
+        self.assertEqual(len(values), self.threads * self.inserts)
+        self.assertTrue(np.all(counts == 3))
+        self.assertEqual(self.engine.get_last_dot_rowid(self.id), total)
+
+
+if __name__ == '__main__':
+    unittest.main()
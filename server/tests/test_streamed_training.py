@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from protocol.ai.collect_data.tools.sqlite_engine import SQLiteEngine
+from protocol.ai.collect_data.tools.basic_classes.user import User
+from protocol.ai.collect_data.tools.neural_network.network import Network
+from protocol.ai.collect_data.tools.neural_network.activations import sigmoid, sigmoid_deriv
+
+
+class StreamedTrainingTest(unittest.TestCase):
+    """
+    Training on the chunks streamed by the engine must match training on the whole array.
+    """
+    batch_size = 16
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.engine = SQLiteEngine(os.path.join(self.dir, 'data.db'))
+        self.engine.insert_user(User('a', 'p', 'a@x'))
+        self.id = self.engine.get_id('a')
+        rng = np.random.default_rng(5)
+        for start in range(0, 100, 25):
+            self.engine.insert_dots_bulk(self.id, rng.random((25, 3)))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_streamed_epochs_match_the_array(self):
+        params = Network([3, 5, 3], 2 * [sigmoid], 2 * [sigmoid_deriv]).to_bytes()
+        data = self.engine.get_user_data(self.id)
+
+        loaded = Network.from_bytes(params, copy=True)
+        loaded.train(data, data, 0.5, cost_to_stop=0, batch_size=self.batch_size, max_epochs=3)
+
+        streamed = Network.from_bytes(params, copy=True)
+        # the chunks of SQLiteEngine share one buffer, the step is done before the next one is read
+        streamed.train_stream(lambda: ((chunk, chunk) for chunk in self.engine.iter_user_data(self.id, self.batch_size)),
+                              0.5, cost_to_stop=0, max_epochs=3)
+
+        for layer, streamed_layer in zip(loaded.layers, streamed.layers):
+            np.testing.assert_allclose(layer.weights, streamed_layer.weights, rtol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()
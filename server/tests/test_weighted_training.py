@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+from protocol.ai.collect_data.tools.neural_network.network import Network
+from protocol.ai.collect_data.tools.neural_network.optimizers import Optimizer
+from protocol.ai.collect_data.tools.neural_network.activations import sigmoid, sigmoid_deriv
+
+
+class GradientRecorder(Optimizer):
+    """
+    An optimizer that never moves the weights and sums the derivatives it is given, per layer.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(0.0)
+        self.sums = {}
+
+    def update(self, layer, weights_deriv, bias_deriv) -> None:
+        total = self.sums.setdefault(id(layer), [0.0, 0.0])
+        total[0] = total[0] + weights_deriv
+        total[1] = total[1] + bias_deriv
+
+
+class WeightedTrainingTest(unittest.TestCase):
+    """
+    A dataset with sample weights must train like the same dataset with every row repeated weight times.
+    """
+    batch_size = 4
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.x = rng.random((8, 3))
+        self.y = rng.random((8, 3))
+        # the two batches have different mean weights (5 and 1)
+        self.weights = np.array([5, 5, 5, 5, 1, 1, 1, 1], dtype=float)
+        self.params = Network([3, 5, 3], 2 * [sigmoid], 2 * [sigmoid_deriv]).to_bytes()
+
+    def __epoch_gradient(self, x, y, sample_weights=None):
+        # the per-sample mean gradient of one epoch, every batch is full so its derivatives are means over batch_size
+        network = Network.from_bytes(self.params, copy=True)
+        recorder = GradientRecorder()
+        network.train(x, y, None, cost_to_stop=0, batch_size=self.batch_size, optimizer=recorder, max_epochs=1,
+                      sample_weights=sample_weights)
+        return [(weights * self.batch_size / len(x), bias * self.batch_size / len(x))
+                for weights, bias in (recorder.sums[id(layer)] for layer in network.layers)]
+
+    def test_weighted_epoch_gradient_matches_duplicated_rows(self):
+        repeats = self.weights.astype(int)
+        weighted = self.__epoch_gradient(self.x, self.y, self.weights)
+        duplicated = self.__epoch_gradient(np.repeat(self.x, repeats, axis=0), np.repeat(self.y, repeats, axis=0))
+
+        for (weights, bias), (dup_weights, dup_bias) in zip(weighted, duplicated):
+            np.testing.assert_allclose(weights, dup_weights, rtol=1e-5, atol=1e-8)
+            np.testing.assert_allclose(bias, dup_bias, rtol=1e-5, atol=1e-8)
+
+    def test_weight_scale_does_not_change_the_gradient(self):
+        np.testing.assert_allclose(self.__epoch_gradient(self.x, self.y, self.weights)[0][0],
+                                   self.__epoch_gradient(self.x, self.y, self.weights * 10)[0][0], rtol=1e-5)
+
+
+if __name__ == '__main__':
+    unittest.main()